@@ -0,0 +1,127 @@
+"""Logging setup: queue-buffered handlers, per-module levels, JSON order events.
+
+Request threads only put records on a queue (QueueHandler); a single
+QueueListener thread formats them and does the actual stream writes.
+Modules log through logging.getLogger(__name__) (app.py through 'app',
+which __name__ is not when it runs as a script); order lifecycle events
+go to the EVENT_LOGGER channel as one compact JSON object per line.
+
+Levels per logger come from DEFAULT_LEVELS, overridden by configure_logging()
+or by PIZZA_LOG_LEVELS, e.g. PIZZA_LOG_LEVELS="models=DEBUG,order_events=WARNING".
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+EVENT_LOGGER = 'order_events'
+
+DEFAULT_LEVELS = {
+    'app': 'INFO',
+    'models': 'INFO',
+    'delivery': 'INFO',
+    'database': 'WARNING',
+    EVENT_LOGGER: 'INFO',
+}
+
+_listener = None
+
+
+class JsonEventFormatter(logging.Formatter):
+    """{"ts": ..., "event": ..., **fields} on one line, fields from log_event()"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class _LoggerFilter(logging.Filter):
+    """Pass (or with exclude=True, drop) records of a single logger"""
+
+    def __init__(self, name, exclude=False):
+        super().__init__()
+        self.logger_name = name
+        self.exclude = exclude
+
+    def filter(self, record):
+        return (record.name == self.logger_name) != self.exclude
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() formats every record on the logging thread so it
+    can be pickled; this queue never leaves the process, so the record is
+    passed on as is and the caller only pays for the enqueue.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def log_event(logger, event, **fields):
+    """Emit an order lifecycle event; no record is created while the channel is off"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(event, extra={'fields': fields})
+
+
+def parse_levels(spec):
+    """'models=DEBUG,delivery=WARNING' -> {'models': 'DEBUG', 'delivery': 'WARNING'}"""
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(levels=None, stream=None, event_stream=None):
+    """Install the queue handler and start the listener (once per process).
+
+    Text records go to stream (default stderr), events to event_stream
+    (default stdout). Returns the QueueListener; it is stopped, flushing
+    what is still queued, at interpreter exit or by shutdown_logging().
+    """
+    global _listener
+    if _listener is not None:
+        shutdown_logging()
+
+    text_handler = logging.StreamHandler(stream or sys.stderr)
+    text_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    text_handler.addFilter(_LoggerFilter(EVENT_LOGGER, exclude=True))
+    event_handler = logging.StreamHandler(event_stream or sys.stdout)
+    event_handler.setFormatter(JsonEventFormatter())
+    event_handler.addFilter(_LoggerFilter(EVENT_LOGGER))
+
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, text_handler, event_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, _InProcessQueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(_InProcessQueueHandler(records))
+
+    all_levels = {**DEFAULT_LEVELS, **(levels or {}), **parse_levels(os.environ.get('PIZZA_LOG_LEVELS'))}
+    for name, level in all_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Stop the listener after it has written every queued record"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
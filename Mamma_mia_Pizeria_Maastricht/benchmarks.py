@@ -0,0 +1,1106 @@
+"""Local performance benchmarks for the pizza shop database layer.
+
+Every benchmark runs against throw-away database files in a temporary
+directory, so pizza_shop.db is never touched.
+
+Usage:
+    python benchmarks.py startup [--runs N]
+    python benchmarks.py concurrency [--runs SECONDS]
+    python benchmarks.py price_cache [--runs N]
+    python benchmarks.py cart_pricing [--runs N]
+    python benchmarks.py assignment [--runs ROUNDS]
+    python benchmarks.py driver_lookup [--runs N]
+    python benchmarks.py dispatch [--runs N]
+    python benchmarks.py staff_reports [--runs N]
+    python benchmarks.py revenue_reports [--runs N]
+    python benchmarks.py live_stats [--runs N]
+    python benchmarks.py time_ranges [--runs N]
+    python benchmarks.py profiler [--runs N]
+    python benchmarks.py logging [--runs N]
+    python benchmarks.py intake [--runs ORDERS]
+    python benchmarks.py group_commit [--runs ORDERS]
+    python benchmarks.py pizza_validation [--runs ORDERS]
+    python benchmarks.py catalog_import [--runs PIZZAS]
+    python benchmarks.py dashboard_stream [--runs N]
+    python benchmarks.py order_tracking [--runs ROUNDS]
+    python benchmarks.py item_reports [--runs N]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import applog
+import delivery
+from catalog import import_catalog
+from database import Database, publish_order_items
+from delivery import FORBIDDEN, solve_assignment
+from intake import OrderIntake
+from models import QUERY_PLAN_CHECKS, PizzaModel, item_price_key
+from profiler import QueryProfiler
+from reports import aggregate_orders
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (elapsed seconds, result)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def report(label, samples):
+    """Print median / min / max of a list of durations in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    print(f"{label:<40} median {statistics.median(ms):9.3f} ms   "
+          f"min {min(ms):9.3f} ms   max {max(ms):9.3f} ms   (n={len(ms)})")
+
+
+def percentile(samples, q):
+    """q-th percentile (0-100) of a list of numbers, nearest-rank"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sample_customer(n, postal_code='6211'):
+    return {
+        'name': f'Bench Customer {n}',
+        'email': f'bench{n}@example.com',
+        'phone': '+31 6 00000000',
+        'address': f'Benchstraat {n}',
+        'postal_code': postal_code,
+        'birth_date': '1990-01-01',
+        'gender': 'Other',
+    }
+
+
+SAMPLE_CART = [
+    {'type': 'pizza', 'id': 1, 'quantity': 2},
+    {'type': 'pizza', 'id': 3, 'quantity': 1},
+    {'type': 'drink', 'id': 1, 'quantity': 2},
+    {'type': 'dessert', 'id': 2, 'quantity': 1},
+]
+
+
+def bench_startup(runs=20):
+    """Cold start (empty file, all migrations) vs warm start (schema current)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cold, warm = [], []
+        for i in range(runs):
+            path = os.path.join(tmp, f'startup_{i}.db')
+            cold.append(timed(Database, path)[0])
+            warm.append(timed(Database, path)[0])
+        report('Database() cold start', cold)
+        report('Database() warm start', warm)
+
+
+def bench_concurrency(runs=3):
+    """Dashboard read latency while a writer thread places orders back to back.
+
+    Compares the old rollback-journal settings against the default WAL profile.
+    runs is the duration of each scenario in seconds. Orders use a postal code
+    with no driver coverage so the measurement is the order write itself.
+    """
+    profiles = [
+        ('rollback journal', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+        ('WAL (default profile)', {}),
+    ]
+    readers = 4
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, profile in profiles:
+            model = PizzaModel(Database(os.path.join(tmp, f'{label[:3]}.db'), profile=profile))
+            stop = threading.Event()
+            read_latencies, errors = [], []
+            placed = [0]
+
+            def writer():
+                n = 0
+                while not stop.is_set():
+                    n += 1
+                    if model.place_order(sample_customer(n, postal_code='9999'), SAMPLE_CART)['success']:
+                        placed[0] += 1
+
+            def reader():
+                while not stop.is_set():
+                    try:
+                        read_latencies.append(timed(model.get_delivery_dashboard)[0])
+                    except Exception as e:
+                        errors.append(e)
+
+            threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                for t in threads:
+                    t.start()
+                time.sleep(runs)
+                stop.set()
+                for t in threads:
+                    t.join()
+            model.db.pool.close_all()
+
+            print(f"{label}: {placed[0]} orders written, {len(read_latencies)} dashboard reads "
+                  f"by {readers} readers, {len(errors)} read errors")
+            if read_latencies:
+                report('  dashboard read latency', read_latencies)
+                print(f"  p99 {percentile(read_latencies, 99) * 1000:.3f} ms")
+
+
+# The pizza_prices view as it was before pizza_price_cache (schema version 1)
+AGGREGATE_PIZZA_PRICES_VIEW = '''
+    CREATE VIEW pizza_prices_aggregate AS
+    SELECT 
+        p.pizza_id,
+        SUM(i.cost) as base_cost,
+        ROUND((SUM(i.cost) * 1.4) * 1.09, 2) as final_price,
+        p.is_vegetarian,
+        CASE WHEN SUM(CASE WHEN i.is_vegan = 0 THEN 1 ELSE 0 END) = 0 THEN 1 ELSE 0 END as is_vegan
+    FROM pizzas p
+    JOIN pizza_ingredients pi ON p.pizza_id = pi.pizza_id
+    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+    GROUP BY p.pizza_id
+'''
+
+
+def add_bench_pizzas(conn, count, seed=42, ingredients_per_pizza=5):
+    """Insert count pizzas with random recipes drawn from the existing ingredients"""
+    rng = random.Random(seed)
+    # Non-vegetarian ingredients first so check_vegetarian_pizza_insert never fires
+    ingredients = [row[0] for row in conn.execute(
+        'SELECT ingredient_id FROM ingredients ORDER BY is_vegetarian, ingredient_id'
+    )]
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    for n in range(count):
+        cursor.execute(
+            "INSERT INTO pizzas (name, description, size, category) VALUES (?, 'benchmark', 'Medium', 'Classic')",
+            (f'Bench Pizza {n}',)
+        )
+        pizza_id = cursor.lastrowid
+        recipe = sorted(rng.sample(range(len(ingredients)), ingredients_per_pizza))
+        cursor.executemany(
+            'INSERT INTO pizza_ingredients (pizza_id, ingredient_id) VALUES (?, ?)',
+            [(pizza_id, ingredients[i]) for i in recipe]
+        )
+    conn.commit()
+
+
+def bench_price_cache(runs=2000, pizzas=10000):
+    """Point price lookups and MIN(final_price): aggregate view vs pizza_price_cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'prices.db'))
+        with db.connection() as conn:
+            elapsed, _ = timed(add_bench_pizzas, conn, pizzas)
+            print(f"loaded {pizzas} pizzas (triggers maintaining the cache) in {elapsed:.2f} s")
+            conn.execute(AGGREGATE_PIZZA_PRICES_VIEW)
+
+            rng = random.Random(7)
+            max_id = conn.execute('SELECT MAX(pizza_id) FROM pizzas').fetchone()[0]
+            ids = [rng.randint(1, max_id) for _ in range(runs)]
+            for source in ('pizza_prices_aggregate', 'pizza_price_cache'):
+                lookup = f'SELECT final_price FROM {source} WHERE pizza_id = ?'
+                samples = [timed(lambda: conn.execute(lookup, (pizza_id,)).fetchone())[0] for pizza_id in ids]
+                report(f'{source} point lookup', samples)
+
+                cheapest = f'SELECT MIN(final_price) FROM {source}'
+                samples = [timed(lambda: conn.execute(cheapest).fetchone())[0] for _ in range(20)]
+                report(f'{source} MIN(final_price)', samples)
+
+            assert conn.execute(
+                'SELECT COUNT(*) FROM pizza_prices_aggregate a JOIN pizza_price_cache c USING (pizza_id) '
+                'WHERE a.final_price != c.final_price OR a.is_vegan != c.is_vegan'
+            ).fetchone()[0] == 0, 'pizza_price_cache disagrees with the aggregate view'
+        db.pool.close_all()
+
+
+def legacy_price_cart(cursor, order_id, items):
+    """place_order's previous pricing: one SELECT per line for the total, then
+    another SELECT plus one INSERT per line for order_items"""
+    queries = {
+        'pizza': 'SELECT final_price FROM pizza_prices WHERE pizza_id = ?',
+        'drink': 'SELECT price FROM drinks WHERE drink_id = ?',
+        'dessert': 'SELECT price FROM desserts WHERE dessert_id = ?',
+    }
+    total = 0
+    for item in items:
+        cursor.execute(queries[item['type']], (item['id'],))
+        total += cursor.fetchone()[0] * item['quantity']
+    for item in items:
+        cursor.execute(queries[item['type']], (item['id'],))
+        price = cursor.fetchone()[0]
+        cursor.execute(
+            'INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time) VALUES (?, ?, ?, ?, ?)',
+            (order_id, item['type'], item['id'], item['quantity'], price)
+        )
+    return total
+
+
+def batched_price_cart(model, cursor, order_id, items):
+    """place_order's current pricing: resolve_item_prices + publish_order_items"""
+    prices = model.resolve_item_prices(cursor, items)
+    total = sum(prices[item_price_key(item)] * item['quantity'] for item in items)
+    publish_order_items(
+        cursor,
+        [(order_id, item['type'], item['id'], item['quantity'], prices[item_price_key(item)]) for item in items]
+    )
+    return total
+
+
+def make_cart(lines):
+    """A cart of `lines` distinct-ish lines, pizza first, cycling through the sample menu"""
+    catalog = [('pizza', i) for i in range(1, 11)] + [('drink', i) for i in range(1, 6)] + [('dessert', i) for i in range(1, 5)]
+    return [{'type': catalog[n % len(catalog)][0], 'id': catalog[n % len(catalog)][1], 'quantity': 1} for n in range(lines)]
+
+
+def bench_cart_pricing(runs=300):
+    """Cart pricing + order_items insert, per-line queries vs batched, for 1-20 line carts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'carts.db')))
+        with model.db.connection() as conn:
+            cursor = conn.cursor()
+            for lines in (1, 5, 10, 20):
+                cart = make_cart(lines)
+                for label, price_cart in (('per-line', lambda oid: legacy_price_cart(cursor, oid, cart)),
+                                          ('batched', lambda oid: batched_price_cart(model, cursor, oid, cart))):
+                    samples = []
+                    for _ in range(runs):
+                        cursor.execute('BEGIN')
+                        cursor.execute("INSERT INTO orders (customer_id, total_amount) VALUES (1, 0)")
+                        samples.append(timed(price_cart, cursor.lastrowid)[0])
+                        conn.rollback()
+                    report(f'{lines:2d}-line cart, {label}', samples)
+
+        samples = {lines: [] for lines in (1, 5, 10, 20)}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for lines in samples:
+                for n in range(runs // 10 or 1):
+                    customer = sample_customer(f'{lines}-{n}', postal_code='9999')
+                    samples[lines].append(timed(model.place_order, customer, make_cart(lines))[0])
+        for lines, durations in samples.items():
+            report(f'{lines:2d}-line cart, place_order end to end', durations)
+        model.db.pool.close_all()
+
+
+# One postal code per sample driver, so every order in a round has a free driver
+DRIVER_POSTAL_CODES = ['6211', '6221', '6217', '6215', '6214']
+
+
+def bench_assignment(runs=40):
+    """Concurrent place_order calls that each should get a driver.
+
+    Each round frees all drivers, then one thread per driver places an
+    order in that driver's area at the same moment. A lost assignment is
+    an order committed without its driver (or with a driver the result did
+    not report); a double booking is two orders of one round on one driver.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'assign.db')))
+        results, latencies = [], []
+        lock = threading.Lock()
+
+        def place(n, postal_code, barrier):
+            barrier.wait()
+            elapsed, result = timed(model.place_order, sample_customer(n, postal_code), SAMPLE_CART)
+            with lock:
+                results.append(result)
+                latencies.append(elapsed)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for round_no in range(runs):
+                with model.db.connection() as conn:
+                    conn.execute('UPDATE delivery_persons SET is_available = 1, last_delivery_time = NULL')
+                    conn.commit()
+                model.driver_index.invalidate()
+                barrier = threading.Barrier(len(DRIVER_POSTAL_CODES))
+                threads = [
+                    threading.Thread(target=place, args=(round_no * 100 + i, code, barrier))
+                    for i, code in enumerate(DRIVER_POSTAL_CODES)
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+        wall = time.perf_counter() - start
+
+        failed = [r for r in results if not r['success']]
+        placed = [r for r in results if r['success']]
+        with model.db.connection() as conn:
+            stored = dict(conn.execute('SELECT order_id, delivery_person_id FROM orders').fetchall())
+        lost = [
+            r for r in placed
+            if not r['delivery_assignment'] or stored.get(r['order_id']) != r['delivery_assignment']['driver_id']
+        ]
+        per_round = {}
+        for r in placed:
+            if r['delivery_assignment']:
+                key = (r['order_id'] - 1) // len(DRIVER_POSTAL_CODES), r['delivery_assignment']['driver_id']
+                per_round[key] = per_round.get(key, 0) + 1
+        double_booked = sum(1 for count in per_round.values() if count > 1)
+
+        print(f"{len(results)} concurrent orders in {wall:.2f} s: {len(placed)} placed, {len(failed)} failed, "
+              f"{len(lost)} lost assignments, {double_booked} double-booked drivers")
+        for r in failed[:3]:
+            print(f"  failure: {r['error']}")
+        report('place_order latency under contention', latencies)
+        model.db.pool.close_all()
+
+
+# get_available_delivery_persons' query before the in-memory index
+LEGACY_DRIVER_LOOKUP = '''
+    SELECT dp.driver_id, ac.delivery_time_minutes,
+        CASE 
+            WHEN dp.last_delivery_time IS NULL THEN 1
+            WHEN datetime(dp.last_delivery_time) <= datetime('now', '-30 minutes') THEN 1
+            ELSE 0
+        END as is_actually_available
+    FROM delivery_persons dp
+    JOIN area_coverage ac ON dp.driver_id = ac.driver_id
+    WHERE ac.postal_code = ?
+    AND (dp.is_available = 1 OR datetime(dp.last_delivery_time) <= datetime('now', '-30 minutes'))
+    ORDER BY is_actually_available DESC, ac.delivery_time_minutes ASC
+    LIMIT 1
+'''
+
+
+def add_bench_drivers(conn, drivers, postal_codes, areas_per_driver=5, seed=11):
+    """Insert drivers covering random postal codes ('7000'..), with mixed availability"""
+    rng = random.Random(seed)
+    codes = [str(7000 + i) for i in range(postal_codes)]
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    for n in range(drivers):
+        cursor.execute(
+            "INSERT INTO delivery_persons (name, phone, is_available, last_delivery_time, vehicle_type) "
+            "VALUES (?, '+31 6 00000000', ?, datetime('now', ?), 'Bike')",
+            (f'Bench Driver {n}', rng.randint(0, 1), f'-{rng.randint(0, 90)} minutes')
+        )
+        driver_id = cursor.lastrowid
+        cursor.executemany(
+            'INSERT INTO area_coverage (driver_id, postal_code, area_name, delivery_time_minutes) VALUES (?, ?, ?, ?)',
+            [(driver_id, code, f'Area {code}', rng.randint(10, 60)) for code in rng.sample(codes, areas_per_driver)]
+        )
+    conn.commit()
+    return codes
+
+
+def bench_driver_lookup(runs=5000, drivers=2000, postal_codes=200):
+    """Best-driver selection: SQL join per order vs DriverAvailabilityIndex"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'drivers.db')))
+        with model.db.connection() as conn:
+            codes = add_bench_drivers(conn, drivers, postal_codes)
+            rng = random.Random(3)
+            lookups = [rng.choice(codes) for _ in range(runs)]
+
+            samples = [timed(lambda: conn.execute(LEGACY_DRIVER_LOOKUP, (code,)).fetchone())[0] for code in lookups]
+            report(f'SQL lookup ({drivers} drivers)', samples)
+
+            elapsed, _ = timed(model.driver_index.load, conn)
+            print(f"index load: {elapsed * 1000:.1f} ms")
+            samples = [timed(model.driver_index.best_driver, code)[0] for code in lookups]
+            report(f'index best_driver ({drivers} drivers)', samples)
+
+            # Selection plus the claim that follows it, as in assign_delivery_person
+            samples = []
+            for code in lookups:
+                def select_and_claim():
+                    driver = model.driver_index.best_driver(code)
+                    if driver:
+                        model.driver_index.update_driver(driver['driver_id'], is_available=False)
+                        model.driver_index.update_driver(driver['driver_id'], is_available=True)
+                samples.append(timed(select_and_claim)[0])
+            report('index select + claim + release', samples)
+        model.db.pool.close_all()
+
+
+def add_waiting_orders(conn, count, postal_codes, seed=17):
+    """One customer and one driverless Pending order per postal code drawn from postal_codes"""
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    for n in range(count):
+        customer = sample_customer(f'w{n}', rng.choice(postal_codes))
+        cursor.execute('''
+            INSERT INTO customers (name, email, phone, address, postal_code, birth_date, gender)
+            VALUES (:name, :email, :phone, :address, :postal_code, :birth_date, :gender)
+        ''', customer)
+        cursor.execute(
+            "INSERT INTO orders (customer_id, total_amount, status, order_date) "
+            "VALUES (?, 20.0, 'Pending', datetime('now', ?))",
+            (cursor.lastrowid, f'-{count - n} seconds')
+        )
+    conn.commit()
+
+
+def reset_dispatch(model):
+    """Put every order back in the queue and every driver back on the road"""
+    with model.db.connection() as conn:
+        conn.execute("UPDATE orders SET delivery_person_id = NULL, estimated_delivery_time = NULL, status = 'Pending'")
+        conn.execute('UPDATE delivery_persons SET is_available = 1, last_delivery_time = NULL')
+        conn.commit()
+    model.driver_index.invalidate()
+
+
+def bench_dispatch(runs=5, orders=500, drivers=100, postal_codes=20):
+    """Driver assignment for a queue of waiting orders: one at a time vs batch optimum"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'dispatch.db')))
+        with model.db.connection() as conn:
+            codes = add_bench_drivers(conn, drivers, postal_codes)
+            add_waiting_orders(conn, orders, codes)
+            queue = conn.execute('''
+                SELECT o.order_id, c.postal_code FROM orders o
+                JOIN customers c ON o.customer_id = c.customer_id
+                ORDER BY o.order_date, o.order_id
+            ''').fetchall()
+
+        greedy, batch = [], []
+        for _ in range(runs):
+            reset_dispatch(model)
+
+            def one_at_a_time():
+                minutes = []
+                for order_id, postal_code in queue:
+                    assignment = model.assign_delivery_person(postal_code, order_id)
+                    if assignment:
+                        minutes.append(assignment['delivery_time_minutes'])
+                return minutes
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, minutes = timed(one_at_a_time)
+            greedy.append(elapsed)
+            reset_dispatch(model)
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, result = timed(model.dispatch_pending_orders)
+            batch.append(elapsed)
+
+        label = f'{orders} orders x {drivers} drivers'
+        report(f'one at a time ({label})', greedy)
+        print(f"    assigned {len(minutes)}, total delivery time {sum(minutes)} min")
+        report(f'dispatch_pending_orders ({label})', batch)
+        print(f"    assigned {result['assigned']}, total delivery time {result['total_delivery_minutes']} min")
+
+        # Solver alone, without the transaction around it
+        reset_dispatch(model)
+        with model.db.connection() as conn:
+            model.driver_index.load(conn)
+        eligible = model.driver_index.eligible_drivers()
+        cost = [
+            [areas.get(postal_code, FORBIDDEN) for _, postal_code in queue]
+            for _, areas in eligible.values()
+        ]
+        solvers = [('solve_assignment', solve_assignment)]
+        if delivery.np is not None:
+            solvers.append(('pure Python fallback', delivery._hungarian_python))
+        for name, solver in solvers:
+            report(f'{name} ({len(cost)}x{len(queue)})', [timed(solver, cost)[0] for _ in range(runs)])
+        model.db.pool.close_all()
+
+
+def add_bench_orders(conn, orders, customers=10000, postal_codes=('6211', '6212', '6221', '6222', '6229')):
+    """Bulk-insert customers and orders (one pizza + one drink line each) spread over the last year"""
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    cursor.executemany('''
+        INSERT INTO customers (name, email, phone, address, postal_code, birth_date, gender, total_pizzas_ordered)
+        VALUES (?, ?, '+31 6 00000000', 'Benchstraat 1', ?, ?, ?, ?)
+    ''', [
+        (f'Bulk Customer {n}', f'bulk{n}@example.com', postal_codes[n % len(postal_codes)],
+         f'{1950 + n % 55}-{1 + n % 12:02d}-{1 + n % 28:02d}', ('Male', 'Female', 'Other')[n % 3], n % 7)
+        for n in range(customers)
+    ])
+    first_customer = cursor.execute("SELECT MIN(customer_id) FROM customers WHERE email LIKE 'bulk%'").fetchone()[0]
+    first_order = cursor.execute('SELECT COALESCE(MAX(order_id), 0) + 1 FROM orders').fetchone()[0]
+    cursor.execute('''
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n + 1 < ?)
+        INSERT INTO orders (order_id, customer_id, order_date, total_amount, discount_applied, status, delivery_person_id)
+        SELECT ? + n,
+               ? + abs(random()) % ?,
+               datetime('now', '-' || (abs(random()) % 525600) || ' minutes'),
+               5 + abs(random()) % 60,
+               CASE WHEN n % 10 = 0 THEN 2.5 ELSE 0 END,
+               CASE WHEN n % 20 = 0 THEN 'Pending' ELSE 'Delivered' END,
+               1 + n % 5
+        FROM seq
+    ''', (orders, first_order, first_customer, customers))
+    cursor.execute('''
+        UPDATE orders SET actual_delivery_time = datetime(order_date, '+' || (15 + order_id % 45) || ' minutes')
+        WHERE order_id >= ? AND status = 'Delivered'
+    ''', (first_order,))
+    for item_type, item_id, quantity, price in (('pizza', '1 + order_id % 10', '1 + order_id % 3', 9.5),
+                                               ('drink', '1 + order_id % 5', '1', 2.5)):
+        cursor.execute(f'''
+            INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time)
+            SELECT order_id, ?, {item_id}, {quantity}, ? FROM orders WHERE order_id >= ?
+        ''', (item_type, price, first_order))
+    conn.commit()
+
+
+# The order-level queries get_staff_reports used to run one by one (helper
+# methods included), each scanning orders on its own
+LEGACY_STAFF_REPORT_QUERIES = [
+    '''SELECT o.order_id, c.name, o.order_date, o.total_amount, o.status, dp.name, dp.phone, dp.vehicle_type
+       FROM orders o JOIN customers c ON o.customer_id = c.customer_id
+       LEFT JOIN delivery_persons dp ON o.delivery_person_id = dp.driver_id
+       WHERE o.status != 'Delivered' ORDER BY o.order_date ''',
+    '''SELECT c.gender, SUM(o.total_amount) FROM orders o JOIN customers c ON o.customer_id = c.customer_id
+       GROUP BY c.gender ''',
+    '''SELECT CASE
+           WHEN (strftime('%Y', 'now') - strftime('%Y', birth_date)) < 25 THEN 'Under 25'
+           WHEN (strftime('%Y', 'now') - strftime('%Y', birth_date)) BETWEEN 25 AND 40 THEN '25-40'
+           ELSE 'Over 40' END as age_group, SUM(o.total_amount)
+       FROM orders o JOIN customers c ON o.customer_id = c.customer_id GROUP BY age_group ''',
+    '''SELECT c.postal_code, SUM(o.total_amount) FROM orders o JOIN customers c ON o.customer_id = c.customer_id
+       GROUP BY c.postal_code ''',
+    'SELECT COUNT(*) FROM orders',
+    'SELECT AVG(total_amount) FROM orders WHERE total_amount > 0',
+    '''SELECT ROUND(AVG((julianday(actual_delivery_time) - julianday(order_date)) * 24 * 60)), COUNT(*),
+       SUM(CASE WHEN (julianday(actual_delivery_time) - julianday(order_date)) * 24 * 60 <= 45 THEN 1 ELSE 0 END)
+       FROM orders WHERE actual_delivery_time IS NOT NULL ''',
+    '''SELECT dp.name, COUNT(*) as delivery_count FROM orders o
+       JOIN delivery_persons dp ON o.delivery_person_id = dp.driver_id
+       WHERE o.actual_delivery_time IS NOT NULL GROUP BY dp.name ORDER BY delivery_count DESC LIMIT 1 ''',
+    'SELECT SUM(discount_applied) FROM orders WHERE discount_applied > 0',
+    '''SELECT COUNT(*) FROM orders WHERE discount_applied > 0
+       AND strftime('%m-%d', order_date) IN (SELECT strftime('%m-%d', birth_date) FROM customers) ''',
+    "SELECT SUM(total_amount) FROM orders WHERE order_date >= date('now', '-1 month') AND total_amount > 0",
+    "SELECT COUNT(DISTINCT customer_id) FROM orders WHERE order_date >= date('now', '-3 month')",
+    '''SELECT strftime('%H', order_date) as hour, COUNT(*) as order_count FROM orders
+       GROUP BY strftime('%H', order_date) ORDER BY order_count DESC LIMIT 3 ''',
+]
+
+
+def bench_staff_reports(runs=3, orders=1000000):
+    """Order-level staff report aggregates: one query each vs a single scan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'reports.db')))
+        with model.db.connection() as conn:
+            elapsed, _ = timed(add_bench_orders, conn, orders)
+            print(f"loaded {orders} orders in {elapsed:.1f} s")
+
+            def legacy():
+                for query in LEGACY_STAFF_REPORT_QUERIES:
+                    conn.execute(query).fetchall()
+
+            report(f'{len(LEGACY_STAFF_REPORT_QUERIES)} separate order queries', [timed(legacy)[0] for _ in range(runs)])
+            report('aggregate_orders (one scan)', [timed(aggregate_orders, conn.cursor())[0] for _ in range(runs)])
+        report('get_staff_reports (complete)', [timed(model.get_staff_reports)[0] for _ in range(runs)])
+        model.db.pool.close_all()
+
+
+def legacy_sales_analytics(conn, interval):
+    """Revenue trend and top items as get_sales_analytics computed them from orders"""
+    conn.execute(f'''
+        SELECT date(order_date), COUNT(*), SUM(total_amount), AVG(total_amount)
+        FROM orders 
+        WHERE order_date >= datetime('now', '-{interval}')
+        GROUP BY date(order_date)
+    ''').fetchall()
+    conn.execute(f'''
+        SELECT oi.item_type, oi.item_id, SUM(oi.quantity), SUM(oi.quantity * oi.price_at_time) as total_sold
+        FROM order_items oi
+        JOIN orders o ON oi.order_id = o.order_id
+        WHERE o.order_date >= datetime('now', '-{interval}')
+        GROUP BY oi.item_type, oi.item_id
+        ORDER BY total_sold DESC
+        LIMIT 10
+    ''').fetchall()
+
+
+def bench_revenue_reports(runs=5, orders=200000):
+    """Period sales analytics: scanning orders vs summing daily_sales_rollup"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'revenue.db')))
+        with model.db.connection() as conn:
+            elapsed, _ = timed(add_bench_orders, conn, orders)
+            print(f"loaded {orders} orders in {elapsed:.1f} s (rollups maintained by triggers)")
+            days = conn.execute('SELECT COUNT(DISTINCT day) FROM daily_sales_rollup').fetchone()[0]
+            rows = conn.execute('SELECT COUNT(*) FROM daily_sales_rollup').fetchone()[0]
+            print(f"daily_sales_rollup: {rows} rows over {days} days")
+            for period, interval in (('today', '1 day'), ('month', '1 month'), ('year', '1 year')):
+                report(f'legacy analytics scan ({period})', [timed(legacy_sales_analytics, conn, interval)[0] for _ in range(runs)])
+                report(f'get_sales_analytics ({period})', [timed(model.get_sales_analytics, period)[0] for _ in range(runs)])
+                report(f'get_revenue_reports ({period})', [timed(model.get_revenue_reports, period)[0] for _ in range(runs)])
+        model.db.pool.close_all()
+
+
+# The real_time_stats figures as get_staff_reports used to query them
+LEGACY_LIVE_STATS_QUERIES = [
+    "SELECT SUM(total_amount) FROM orders WHERE order_date >= date('now', '-1 month') AND total_amount > 0",
+    """SELECT SUM(oi.quantity) FROM order_items oi JOIN orders o ON oi.order_id = o.order_id
+       WHERE oi.item_type = 'pizza' AND o.order_date >= date('now', '-1 month')""",
+    "SELECT COUNT(DISTINCT customer_id) FROM orders WHERE order_date >= date('now', '-3 month')",
+]
+
+
+def bench_live_stats(runs=2000, orders=200000):
+    """Dashboard real_time_stats: window queries vs the live counters"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'live.db')))
+        with model.db.connection() as conn:
+            elapsed, _ = timed(add_bench_orders, conn, orders)
+            print(f"loaded {orders} orders in {elapsed:.1f} s")
+
+            def legacy():
+                for query in LEGACY_LIVE_STATS_QUERIES:
+                    conn.execute(query).fetchall()
+
+            report('window queries', [timed(legacy)[0] for _ in range(max(runs // 200, 3))])
+            live = model.live_sales
+            report('LiveSalesCounters.load', [timed(live.load, conn)[0] for _ in range(3)])
+        report('snapshot', [timed(live.snapshot)[0] for _ in range(runs)])
+        rng = random.Random(3)
+        report('record_order', [timed(live.record_order, rng.randint(1, 10000), 25.0, 2)[0] for _ in range(runs)])
+        model.db.pool.close_all()
+
+
+def bench_time_ranges(runs=10, orders=500000):
+    """Window queries: date() text comparisons vs order_ts ranges on the covering indexes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'ranges.db')))
+        with model.db.connection() as conn:
+            elapsed, _ = timed(add_bench_orders, conn, orders)
+            print(f"loaded {orders} orders in {elapsed:.1f} s")
+            conn.execute('ANALYZE')
+            checks = {name: (query, params) for name, query, params, _ in QUERY_PLAN_CHECKS}
+            for legacy, name in zip(LEGACY_LIVE_STATS_QUERIES, ('Monthly revenue', 'Monthly pizzas', 'Active customers')):
+                query, params = checks[name]
+                report(f'{name} (order_date text)', [timed(lambda: conn.execute(legacy).fetchall())[0] for _ in range(runs)])
+                report(f'{name} (order_ts range)', [timed(lambda: conn.execute(query, params).fetchall())[0] for _ in range(runs)])
+        model.db.pool.close_all()
+
+
+def bench_profiler(runs=300, orders=20000):
+    """Request mix (order, tracking, details, menu, dashboard) with the query profiler off vs on"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, enabled in (('profiler off', False), ('profiler on', True)):
+            model = PizzaModel(Database(os.path.join(tmp, f'{label[-3:].strip()}.db'),
+                                        profiler=QueryProfiler(enabled=enabled)))
+            model.generate_test_data(orders, seed=5)
+
+            def request_mix(n):
+                result = model.place_order(sample_customer(n), SAMPLE_CART)
+                model.get_delivery_tracking(result['order_id'])
+                model.get_order_details(result['order_id'])
+                model.get_menu()
+                model.get_delivery_dashboard()
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples = [timed(request_mix, n)[0] for n in range(runs)]
+            report(label, samples)
+            if enabled:
+                elapsed, metrics = timed(model.get_performance_metrics)
+                print(f"get_performance_metrics: {elapsed * 1000:.1f} ms, "
+                      f"{metrics['profiler']['statements_tracked']} statements tracked")
+            model.db.pool.close_all()
+
+
+def bench_logging(runs=2000):
+    """place_order throughput: logging unconfigured vs JSON events vs events plus debug records"""
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        for label, levels in (('logging off', None),
+                              ('order events (INFO)', {}),
+                              ('events + debug records', {'models': 'DEBUG', 'delivery': 'DEBUG'})):
+            model = PizzaModel(Database(os.path.join(tmp, f'{label.split()[0]}.db')))
+            if levels is not None:
+                applog.configure_logging(levels, stream=devnull, event_stream=devnull)
+            start = time.perf_counter()
+            samples = [timed(model.place_order, sample_customer(n), SAMPLE_CART)[0] for n in range(runs)]
+            elapsed = time.perf_counter() - start
+            applog.shutdown_logging()
+            report(label, samples)
+            print(f"{'':<40} {runs / elapsed:9.0f} orders/s")
+            model.db.pool.close_all()
+        for name in applog.DEFAULT_LEVELS:
+            logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def bench_intake(runs=4000, concurrency=(1, 8, 32, 128)):
+    """Concurrent order placement: a thread per client vs the asyncio intake's single writer"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for clients in concurrency:
+            model = PizzaModel(Database(os.path.join(tmp, f'threads{clients}.db'), pool_size=clients))
+            numbers = iter(range(runs))
+            lock = threading.Lock()
+            results = []
+
+            def client():
+                while True:
+                    with lock:
+                        n = next(numbers, None)
+                    if n is None:
+                        return
+                    results.append(model.place_order(sample_customer(n), SAMPLE_CART))
+
+            threads = [threading.Thread(target=client) for _ in range(clients)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            _print_intake_run(f'{clients:>3} threads, own transactions', results, time.perf_counter() - start)
+            model.db.pool.close_all()
+
+            model = PizzaModel(Database(os.path.join(tmp, f'intake{clients}.db')))
+            intake = OrderIntake(model)
+
+            async def drive():
+                queue = asyncio.Queue()
+                for n in range(runs):
+                    queue.put_nowait(n)
+                results = []
+
+                async def client():
+                    while not queue.empty():
+                        results.append(await intake.submit(sample_customer(queue.get_nowait()), SAMPLE_CART))
+
+                await asyncio.gather(*(client() for _ in range(clients)))
+                return results
+
+            elapsed, results = timed(asyncio.run, drive())
+            intake.stop()
+            _print_intake_run(f'{clients:>3} asyncio clients, intake', results, elapsed)
+            print(f"{'':<40} {intake.stats()['avg_batch']} orders per commit")
+            model.db.pool.close_all()
+
+
+def bench_group_commit(runs=3000, clients=32, windows=(None, 0.0, 0.0005, 0.002, 0.005, 0.01)):
+    """Orders/s from concurrent place_order threads vs group commit window (None = commit per order)"""
+    profiles = [
+        ('WAL, synchronous=NORMAL', {}),
+        ('WAL, synchronous=FULL', {'synchronous': 'FULL'}),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile_label, profile in profiles:
+            print(profile_label)
+            for window in windows:
+                model = PizzaModel(Database(os.path.join(tmp, f'gc{len(profile)}-{window}.db'), pool_size=clients,
+                                            profile=profile),
+                                   group_commit_window=window)
+                numbers = iter(range(runs))
+                lock = threading.Lock()
+                results = []
+
+                def client():
+                    while True:
+                        with lock:
+                            n = next(numbers, None)
+                        if n is None:
+                            return
+                        results.append(model.place_order(sample_customer(n), SAMPLE_CART))
+
+                threads = [threading.Thread(target=client) for _ in range(clients)]
+                start = time.perf_counter()
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - start
+                label = 'per-order commit' if window is None else f'window {window * 1000:g} ms'
+                _print_intake_run(f'  {label}', results, elapsed)
+                if model.order_writer:
+                    print(f"{'':<40} {model.order_writer.stats()['avg_batch']} orders per commit")
+                    model.order_writer.stop()
+                model.db.pool.close_all()
+
+
+# The per-row check migration 7 dropped, recreated to measure it
+LEGACY_ORDER_HAS_PIZZA_TRIGGER = '''
+    CREATE TRIGGER validate_order_has_pizza
+    AFTER INSERT ON order_items
+    FOR EACH ROW
+    WHEN (SELECT COUNT(*) FROM order_items WHERE order_id = NEW.order_id AND item_type = 'pizza') = 0
+    BEGIN
+        DELETE FROM orders WHERE order_id = NEW.order_id;
+        SELECT RAISE(ABORT, 'Order must contain at least one pizza');
+    END
+'''
+
+
+def bench_pizza_validation(runs=2000, bulk_orders=20000, bulk_lines=10):
+    """Writing order lines: per-row validate_order_has_pizza trigger vs publish_order_items"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, legacy in (('per-row trigger', True), ('publish_order_items', False)):
+            model = PizzaModel(Database(os.path.join(tmp, f'{label[:3]}.db')))
+            with model.db.connection() as conn:
+                if legacy:
+                    conn.execute(LEGACY_ORDER_HAS_PIZZA_TRIGGER)
+
+                def write_lines(rows):
+                    if legacy:
+                        conn.executemany(
+                            'INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time) '
+                            'VALUES (?, ?, ?, ?, ?)', rows
+                        )
+                    else:
+                        publish_order_items(conn.cursor(), rows)
+
+                def new_orders(count):
+                    first = conn.execute('SELECT COALESCE(MAX(order_id), 0) + 1 FROM orders').fetchone()[0]
+                    conn.executemany('INSERT INTO orders (order_id, customer_id, total_amount) VALUES (?, 1, 10)',
+                                     [(first + n,) for n in range(count)])
+                    return range(first, first + count)
+
+                print(label)
+                for lines in (1, 10, 20):
+                    conn.execute('BEGIN IMMEDIATE')
+                    samples = []
+                    for order_id in new_orders(runs):
+                        rows = [(order_id, item['type'], item['id'], 1, 5.0) for item in make_cart(lines)]
+                        samples.append(timed(write_lines, rows)[0])
+                    conn.commit()
+                    report(f'  {lines:>2}-line order', samples)
+
+                conn.execute('BEGIN IMMEDIATE')
+                rows = [(order_id, item['type'], item['id'], 1, 5.0)
+                        for order_id in new_orders(bulk_orders)
+                        for item in make_cart(bulk_lines)]
+                elapsed, _ = timed(write_lines, rows)
+                conn.commit()
+                print(f"  bulk load of {len(rows)} lines: {elapsed:.2f} s ({len(rows) / elapsed:,.0f} lines/s)")
+            model.db.pool.close_all()
+
+
+def bench_catalog_import(runs=10000, ingredients_per_pizza=5):
+    """Loading runs pizzas with their recipes: per-row triggers vs import_catalog"""
+    rng = random.Random(23)
+    ingredients = [{'name': f'Bench Ingredient {n}', 'cost': round(rng.uniform(0.3, 3.0), 2),
+                    'is_vegetarian': n % 4 != 0, 'is_vegan': n % 4 == 1} for n in range(200)]
+    pizzas = [{'name': f'Bench Pizza {n}', 'description': 'benchmark', 'size': 'Medium', 'category': 'Classic'}
+              for n in range(runs)]
+    recipes = [{'pizza': pizza['name'], 'ingredient': ingredients[i]['name'], 'quantity': 1}
+               for pizza in pizzas for i in rng.sample(range(len(ingredients)), ingredients_per_pizza)]
+    catalog = {'ingredients': ingredients, 'pizzas': pizzas, 'recipes': recipes}
+
+    def per_row(conn):
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany('INSERT INTO ingredients (name, cost, is_vegetarian, is_vegan) VALUES (?, ?, ?, ?)',
+                           [(i['name'], i['cost'], i['is_vegetarian'], i['is_vegan']) for i in ingredients])
+        ids = dict(cursor.execute('SELECT name, ingredient_id FROM ingredients'))
+        vegetarian = {i['name']: i['is_vegetarian'] for i in ingredients}
+        pizza_ids = {}
+        for pizza in pizzas:
+            cursor.execute('INSERT INTO pizzas (name, description, size, category) VALUES (?, ?, ?, ?)',
+                           (pizza['name'], pizza['description'], pizza['size'], pizza['category']))
+            pizza_ids[pizza['name']] = cursor.lastrowid
+        # Meat first so check_vegetarian_pizza_insert never fires
+        cursor.executemany(
+            'INSERT INTO pizza_ingredients (pizza_id, ingredient_id, quantity) VALUES (?, ?, ?)',
+            [(pizza_ids[r['pizza']], ids[r['ingredient']], r['quantity'])
+             for r in sorted(recipes, key=lambda r: vegetarian[r['ingredient']])]
+        )
+        conn.commit()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshots = {}
+        for label, load in (('per-row triggers', per_row), ('import_catalog', lambda conn: import_catalog(conn, catalog))):
+            db = Database(os.path.join(tmp, f'{label[:3]}.db'))
+            with db.connection() as conn:
+                elapsed, _ = timed(load, conn)
+                print(f"{label:<40} {elapsed:9.2f} s   {len(recipes)} recipe lines ({len(recipes) / elapsed:,.0f} lines/s)")
+                snapshots[label] = conn.execute('''
+                    SELECT p.name, p.is_vegetarian, c.final_price, c.is_vegan
+                    FROM pizzas p LEFT JOIN pizza_price_cache c ON c.pizza_id = p.pizza_id ORDER BY p.name
+                ''').fetchall()
+            db.pool.close_all()
+        assert snapshots['per-row triggers'] == snapshots['import_catalog'], 'import_catalog disagrees with the triggers'
+
+
+def bench_dashboard_stream(runs=500, orders=20000, active=1000, screens=(0, 1, 10, 100), poll_interval=2.0):
+    """Open delivery dashboards: polling get_delivery_dashboard vs the pushed feed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'dashboard.db')))
+        model.generate_test_data(orders, seed=9)
+        with model.db.connection() as conn:
+            conn.execute('''
+                UPDATE orders SET status = 'Preparing', estimated_delivery_time = datetime('now', '+20 minutes')
+                WHERE order_id IN (SELECT order_id FROM orders ORDER BY order_id DESC LIMIT ?)
+            ''', (active,))
+            conn.commit()
+            order_ids = [row[0] for row in conn.execute(
+                "SELECT order_id FROM orders WHERE status = 'Preparing' LIMIT ?", (runs,)
+            )]
+        print(f"{active} active deliveries, {len(order_ids)} status changes per run")
+
+        samples = [timed(model.get_delivery_dashboard)[0] for _ in range(50)]
+        report('one poll of get_delivery_dashboard', samples)
+        poll = statistics.median(samples)
+        for count in screens[1:]:
+            print(f"  {count:>3} screens polling every {poll_interval:g} s: "
+                  f"{count * poll / poll_interval * 1000:8.1f} ms of queries per second")
+
+        statuses = ('Out for Delivery', 'Preparing')
+        for n, count in enumerate(screens):
+            subscriptions = [model.subscribe_delivery_dashboard()[0] for _ in range(count)]
+            status = statuses[n % 2]
+            samples = [timed(model.update_delivery_status, order_id, status)[0] for order_id in order_ids]
+            received = sum(len(list(iter(lambda: subscription.get(timeout=0), None))) for subscription in subscriptions)
+            report(f'status change, {count:>3} screens streaming', samples)
+            if count:
+                print(f"  {received / count:.0f} events per screen")
+            for subscription in subscriptions:
+                model.unsubscribe_delivery_dashboard(subscription)
+        model.db.pool.close_all()
+
+
+def bench_order_tracking(runs=5, trackers=10000, threads=16, changes=200):
+    """trackers customers polling their order once per round: SQL per poll vs TrackingCache + ETag"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'tracking.db')))
+        with model.db.connection() as conn:
+            add_waiting_orders(conn, trackers, ('6211', '6212', '6221', '6222', '6229'))
+            order_ids = [row[0] for row in conn.execute("SELECT order_id FROM orders WHERE status = 'Pending'")]
+        rng = random.Random(3)
+
+        def legacy_poll(order_id, etags):
+            # The old route: the four-way join and a fresh JSON body every time
+            tracking = model._read_delivery_tracking([order_id])[order_id]
+            json_body = json.dumps(tracking)
+            return len(json_body) > 0
+
+        def cached_poll(order_id, etags):
+            entry = model.get_delivery_tracking_entry(order_id)
+            unchanged = etags.get(order_id) == entry.etag
+            etags[order_id] = entry.etag
+            return unchanged
+
+        for label, poll in (('SQL per poll', legacy_poll), ('TrackingCache + ETag', cached_poll)):
+            etags = {}
+            with ThreadPoolExecutor(threads) as pool:
+                for round_number in range(runs):
+                    for order_id in rng.sample(order_ids, changes):
+                        model.update_delivery_status(order_id, ('Preparing', 'Out for Delivery')[round_number % 2])
+                    model.db.profiler.reset()
+                    elapsed, results = timed(lambda: list(pool.map(lambda order_id: poll(order_id, etags), order_ids)))
+                    queries = sum(row['calls'] for row in model.db.profiler.snapshot())
+                    not_modified = sum(results) if poll is cached_poll else 0
+                    print(f"{label:<22} round {round_number}: {len(order_ids) / elapsed:9.0f} polls/s   "
+                          f"{not_modified:>5} x 304   {queries:>5} SQL statements")
+        print(model.get_tracking_cache_stats())
+        model.db.pool.close_all()
+
+
+# Item names as order_items lookups resolved them before catalog_items
+LEGACY_ITEM_NAME = '''CASE 
+                    WHEN item_type = 'pizza' THEN (SELECT name FROM pizzas WHERE pizza_id = item_id)
+                    WHEN item_type = 'drink' THEN (SELECT name FROM drinks WHERE drink_id = item_id)
+                    WHEN item_type = 'dessert' THEN (SELECT name FROM desserts WHERE dessert_id = item_id)
+                END'''
+
+# (label, query before catalog_items and the covering index, query now)
+ITEM_REPORT_QUERIES = [
+    ('order detail lines', f'''
+        SELECT {LEGACY_ITEM_NAME}, quantity, price_at_time FROM order_items WHERE order_id = ?
+    ''', '''
+        SELECT ci.name, oi.quantity, oi.price_at_time
+        FROM order_items oi
+        LEFT JOIN catalog_items ci ON ci.item_type = oi.item_type AND ci.item_id = oi.item_id
+        WHERE oi.order_id = ? ORDER BY oi.rowid
+    '''),
+    ('sales of one item', '''
+        SELECT SUM(quantity), SUM(quantity * price_at_time) FROM order_items NOT INDEXED
+        WHERE item_type = ? AND item_id = ?
+    ''', '''
+        SELECT SUM(quantity), SUM(quantity * price_at_time) FROM order_items
+        WHERE item_type = ? AND item_id = ?
+    '''),
+    ('top 10 items, all time', f'''
+        SELECT {LEGACY_ITEM_NAME}, item_type, SUM(quantity) AS sold, SUM(quantity * price_at_time)
+        FROM order_items NOT INDEXED GROUP BY item_type, item_id ORDER BY sold DESC LIMIT 10
+    ''', '''
+        SELECT ci.name, t.item_type, t.sold, t.revenue
+        FROM (
+            SELECT item_type, item_id, SUM(quantity) AS sold, SUM(quantity * price_at_time) AS revenue
+            FROM order_items GROUP BY item_type, item_id
+        ) t
+        LEFT JOIN catalog_items ci ON ci.item_type = t.item_type AND ci.item_id = t.item_id
+        ORDER BY t.sold DESC LIMIT 10
+    '''),
+]
+
+
+def bench_item_reports(runs=200, order_items=10000000):
+    """Item name lookups and per-item totals over order_items: before vs after catalog_items"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = PizzaModel(Database(os.path.join(tmp, 'items.db')))
+        with model.db.connection() as conn:
+            conn.execute('DROP INDEX idx_order_items_item_covering')
+            elapsed, _ = timed(add_bench_orders, conn, order_items // 2)
+            count = conn.execute('SELECT COUNT(*) FROM order_items').fetchone()[0]
+            print(f"loaded {count} order_items in {elapsed:.1f} s")
+            elapsed, _ = timed(model.db.migrate_catalog_items, conn.cursor())
+            conn.commit()
+            print(f"migrate_catalog_items (covering index build) in {elapsed:.1f} s")
+            for name, result in model.test_query_plans():
+                print(f"{name:<24} {result}")
+
+            rng = random.Random(13)
+            max_order = conn.execute('SELECT MAX(order_id) FROM orders').fetchone()[0]
+            for label, legacy, current in ITEM_REPORT_QUERIES:
+                if '?' not in legacy:
+                    params = [()] * max(3, runs // 100)
+                elif 'order_id' in legacy:
+                    params = [(rng.randint(1, max_order),) for _ in range(runs)]
+                else:
+                    params = [(rng.choice(('pizza', 'drink')), rng.randint(1, 5)) for _ in range(max(3, runs // 20))]
+                for version, query in (('before', legacy), ('now', current)):
+                    samples = [timed(lambda: conn.execute(query, p).fetchall())[0] for p in params]
+                    report(f'{label} ({version})', samples)
+                assert conn.execute(legacy, params[0]).fetchall() == conn.execute(current, params[0]).fetchall()
+        model.db.pool.close_all()
+
+
+def _print_intake_run(label, results, elapsed):
+    failed = [r['error'] for r in results if not r['success']]
+    locked = sum('locked' in error for error in failed)
+    print(f"{label:<40} {len(results) / elapsed:9.0f} orders/s   {len(failed)} failed ({locked} locked)")
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'concurrency': bench_concurrency,
+    'price_cache': bench_price_cache,
+    'cart_pricing': bench_cart_pricing,
+    'assignment': bench_assignment,
+    'driver_lookup': bench_driver_lookup,
+    'dispatch': bench_dispatch,
+    'staff_reports': bench_staff_reports,
+    'revenue_reports': bench_revenue_reports,
+    'live_stats': bench_live_stats,
+    'time_ranges': bench_time_ranges,
+    'profiler': bench_profiler,
+    'logging': bench_logging,
+    'intake': bench_intake,
+    'group_commit': bench_group_commit,
+    'pizza_validation': bench_pizza_validation,
+    'catalog_import': bench_catalog_import,
+    'dashboard_stream': bench_dashboard_stream,
+    'order_tracking': bench_order_tracking,
+    'item_reports': bench_item_reports,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--runs', type=int, default=None, help='override the number of runs')
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        print(f"== {name} ==")
+        kwargs = {'runs': args.runs} if args.runs else {}
+        BENCHMARKS[name](**kwargs)
+
+
+if __name__ == '__main__':
+    main()
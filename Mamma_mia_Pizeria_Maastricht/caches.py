@@ -0,0 +1,238 @@
+import itertools
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# One built menu: the catalog_version it was read at, the dict handed to
+# templates and the same data pre-serialized for the JSON API
+MenuSnapshot = namedtuple('MenuSnapshot', ['version', 'menu', 'json'])
+
+# One order's tracking data: the dict from get_delivery_tracking(), the same
+# pre-serialized, and the ETag of that version
+TrackingEntry = namedtuple('TrackingEntry', ['etag', 'tracking', 'json', 'loaded_at'])
+
+
+class MenuCache:
+    """Process-wide menu snapshot, valid while catalog_version is unchanged.
+
+    The cached dict is shared between requests and must be treated as
+    read-only by callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, build):
+        """Return the snapshot for version, calling build() to rebuild it on a miss"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        # Build outside the lock; concurrent misses just race to store the same data
+        menu = build()
+        snapshot = MenuSnapshot(version, menu, json.dumps(menu).encode('utf-8'))
+
+        with self._lock:
+            if self._snapshot is None or version >= self._snapshot.version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'cached_version': self._snapshot.version if self._snapshot else None,
+                'cached_bytes': len(self._snapshot.json) if self._snapshot else 0
+            }
+
+
+class TrackingCache:
+    """Per-order delivery tracking, written through by the model's order updates.
+
+    Every distinct version of an order's tracking gets a new ETag (a
+    per-process token plus a counter, so tags never repeat across
+    restarts or evictions); storing unchanged data keeps the tag, so
+    clients holding it can be answered 304 without any SQL.
+
+    At most max_entries orders are kept. Eviction is least recently
+    polled first, taking delivered and cancelled orders before any that
+    are still on their way. Entries older than reconcile_interval seconds
+    are re-read on the next poll, to pick up changes made by other
+    processes.
+    """
+
+    FINAL_STATUSES = ('Delivered', 'Cancelled')
+
+    def __init__(self, max_entries=10000, reconcile_interval=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.reconcile_interval = reconcile_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._active = OrderedDict()  # order_id -> TrackingEntry, least recently polled first
+        self._final = OrderedDict()   # the same for delivered / cancelled orders
+        self._loading = {}            # order_id -> token of the read in flight for a miss
+        self._token = secrets.token_hex(4)
+        self._versions = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, order_id, load):
+        """Entry for order_id, calling load() -> tracking dict or None on a miss"""
+        with self._lock:
+            entry = self._lookup(order_id)
+            if entry is not None and self.clock() - entry.loaded_at < self.reconcile_interval:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            token = object()
+            self._loading[order_id] = token
+
+        # Read outside the lock; a write to the order meanwhile (refresh())
+        # withdraws the token, and then this result is served but not kept
+        tracking = load()
+
+        with self._lock:
+            current = self._loading.get(order_id) is token
+            if current:
+                del self._loading[order_id]
+            if tracking is None:
+                self._discard(order_id)
+                return None
+            return self._store(order_id, tracking, keep=current)
+
+    def refresh(self, order_ids, load_many):
+        """Write-through after a commit: re-read the cached ones of order_ids.
+
+        load_many(order_ids) -> {order_id: tracking dict}; orders missing
+        from it are dropped.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                cached = []
+                for order_id in set(order_ids):
+                    if order_id in self._loading:
+                        self._loading[order_id] = None
+                    if order_id in self._active or order_id in self._final:
+                        cached.append(order_id)
+            if not cached:
+                return
+            rows = load_many(cached)
+            with self._lock:
+                for order_id in cached:
+                    if order_id in rows:
+                        self._store(order_id, rows[order_id], keep=True)
+                    else:
+                        self._discard(order_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._active.clear()
+            self._final.clear()
+            for order_id in self._loading:
+                self._loading[order_id] = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'entries': len(self._active) + len(self._final),
+                'active_entries': len(self._active),
+                'final_entries': len(self._final),
+                'evictions': self.evictions,
+                'max_entries': self.max_entries
+            }
+
+    def _lookup(self, order_id):
+        for entries in (self._active, self._final):
+            entry = entries.get(order_id)
+            if entry is not None:
+                entries.move_to_end(order_id)
+                return entry
+        return None
+
+    def _discard(self, order_id):
+        self._active.pop(order_id, None)
+        self._final.pop(order_id, None)
+
+    def _store(self, order_id, tracking, keep):
+        previous = self._active.get(order_id) or self._final.get(order_id)
+        if previous is not None and previous.tracking == tracking:
+            entry = previous._replace(loaded_at=self.clock())
+        else:
+            entry = TrackingEntry(f'{self._token}-{next(self._versions)}', tracking,
+                                  json.dumps(tracking).encode('utf-8'), self.clock())
+        if not keep:
+            return entry
+
+        self._discard(order_id)
+        entries = self._final if tracking['status'] in self.FINAL_STATUSES else self._active
+        entries[order_id] = entry
+        while len(self._active) + len(self._final) > self.max_entries:
+            (self._final or self._active).popitem(last=False)
+            self.evictions += 1
+        return entry
+
+
+class OrderGenerationWatch:
+    """Tells this process's writes to orders and drivers from other processes'.
+
+    Every write transaction bumps order_generation (see
+    database.bump_order_generation); the model reports each bump it
+    committed with own_write(). A generation this process did not write
+    means another process (intake.py, datagen.py) committed changes its
+    in-memory state has not seen. Readers poll the counter with observe()
+    at most every check_interval seconds, so that is how long such
+    changes can stay unseen.
+    """
+
+    def __init__(self, check_interval=1.0, clock=time.monotonic):
+        self.check_interval = check_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._seen = None      # generation last read with observe()
+        self._own = set()      # generations committed here since then
+        self._checked_at = None
+        self.foreign_writes = 0
+
+    def due(self):
+        return self._checked_at is None or self.clock() - self._checked_at >= self.check_interval
+
+    def own_write(self, previous, generation):
+        """Record a committed bump; True if previous was written by another process"""
+        with self._lock:
+            foreign = (self._seen is None or previous > self._seen) and previous not in self._own
+            self._own.add(generation)
+            if foreign:
+                self.foreign_writes += 1
+            return foreign
+
+    def observe(self, generation):
+        """Record the current generation; True if another process wrote since the last check"""
+        with self._lock:
+            self._checked_at = self.clock()
+            foreign = generation != self._seen and generation not in self._own
+            self._seen = generation
+            self._own = {own for own in self._own if own > generation}
+            if foreign:
+                self.foreign_writes += 1
+            return foreign
@@ -0,0 +1,221 @@
+"""Bulk import of ingredients, pizzas and recipes from JSON or CSV.
+
+The whole catalog is written in one transaction. The per-row triggers
+that re-derive a pizza's vegetarian flag and cached price (and bump
+catalog_version) after every pizza_ingredients row are suspended while
+it is written; afterwards each affected pizza is recomputed once, with
+one set-based statement per derived column, and catalog_version is
+bumped once.
+
+Ingredients are matched by name and updated in place; pizzas are
+matched by (name, size). A pizza listed in recipes gets exactly the
+imported recipe, replacing the one it had.
+
+JSON: {"ingredients": [{"name", "cost", "is_vegetarian", "is_vegan"}],
+       "pizzas": [{"name", "description", "size", "category"}],
+       "recipes": [{"pizza", "size", "ingredient", "quantity"}]}
+CSV:  one file per list, with those fields as header columns.
+
+Usage:
+    python catalog.py [DB_PATH] --json catalog.json
+    python catalog.py [DB_PATH] [--ingredients CSV] [--pizzas CSV] [--recipes CSV]
+"""
+import argparse
+import csv
+import json
+import time
+
+from database import PIZZA_PRICE_REFRESH, Database, suspended_triggers
+
+DEFAULT_SIZE = 'Medium'
+DEFAULT_CATEGORY = 'Classic'
+
+# Per-row triggers whose work import_catalog() does once per pizza instead.
+# check_vegetarian_pizza_insert goes too: row by row it rejects any recipe
+# that lists a vegetarian ingredient before a meat one (the pizza counts as
+# vegetarian in between); here the flag is derived from the whole recipe.
+SUSPENDED_TRIGGERS = (
+    'check_vegetarian_pizza_insert',
+    'update_pizza_vegetarian_status_insert',
+    'update_pizza_vegetarian_status_delete',
+    'pizza_price_cache_recipe_insert',
+    'pizza_price_cache_recipe_delete',
+    'pizza_price_cache_ingredient_update',
+) + tuple(
+    f'bump_catalog_version_{table}_{event}'
+    for table in ('pizzas', 'ingredients', 'pizza_ingredients')
+    for event in ('insert', 'update', 'delete')
+)
+
+# Pizzas whose derived columns are recomputed at the end of an import
+AFFECTED_PIZZAS = 'CREATE TEMP TABLE IF NOT EXISTS catalog_import_pizzas (pizza_id INTEGER PRIMARY KEY)'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def as_flag(value):
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in TRUE_VALUES else 0
+    return 1 if value else 0
+
+
+def read_catalog_json(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {key: data.get(key, []) for key in ('ingredients', 'pizzas', 'recipes')}
+
+
+def read_catalog_csv(ingredients=None, pizzas=None, recipes=None):
+    data = {}
+    for key, path in (('ingredients', ingredients), ('pizzas', pizzas), ('recipes', recipes)):
+        if path:
+            with open(path, newline='', encoding='utf-8') as f:
+                data[key] = list(csv.DictReader(f))
+        else:
+            data[key] = []
+    return data
+
+
+def import_catalog(conn, catalog):
+    """Write catalog (see read_catalog_json) in one transaction.
+
+    Returns counts of what was written. Raises ValueError for a recipe
+    naming an unknown pizza or ingredient and sqlite3.IntegrityError for
+    rows the schema rejects; nothing is written in either case.
+    """
+    ingredients = [
+        (row['name'], float(row['cost']), as_flag(row.get('is_vegetarian')), as_flag(row.get('is_vegan')))
+        for row in catalog.get('ingredients', [])
+    ]
+    pizzas = [
+        (row['name'], row.get('description') or '', row.get('size') or DEFAULT_SIZE,
+         row.get('category') or DEFAULT_CATEGORY)
+        for row in catalog.get('pizzas', [])
+    ]
+    recipes = catalog.get('recipes', [])
+
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(AFFECTED_PIZZAS)
+        with suspended_triggers(cursor, SUSPENDED_TRIGGERS):
+            cursor.executemany('''
+                INSERT INTO ingredients (name, cost, is_vegetarian, is_vegan) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    cost = excluded.cost, is_vegetarian = excluded.is_vegetarian, is_vegan = excluded.is_vegan
+            ''', ingredients)
+            ingredient_ids = dict(cursor.execute('SELECT name, ingredient_id FROM ingredients'))
+
+            pizza_ids = {(name, size): pizza_id
+                         for pizza_id, name, size in cursor.execute('SELECT pizza_id, name, size FROM pizzas')}
+            updated = [(description, category, pizza_ids[(name, size)])
+                       for name, description, size, category in pizzas if (name, size) in pizza_ids]
+            cursor.executemany('UPDATE pizzas SET description = ?, category = ? WHERE pizza_id = ?', updated)
+            next_id = cursor.execute('SELECT COALESCE(MAX(pizza_id), 0) + 1 FROM pizzas').fetchone()[0]
+            created = []
+            for name, description, size, category in pizzas:
+                if (name, size) not in pizza_ids:
+                    pizza_ids[(name, size)] = next_id
+                    created.append((next_id, name, description, size, category))
+                    next_id += 1
+            cursor.executemany(
+                'INSERT INTO pizzas (pizza_id, name, description, size, category, is_vegetarian) '
+                'VALUES (?, ?, ?, ?, ?, 0)', created
+            )
+
+            lines = []
+            for row in recipes:
+                pizza = (row['pizza'], row.get('size') or DEFAULT_SIZE)
+                if pizza not in pizza_ids:
+                    raise ValueError(f"Recipe for unknown pizza: {pizza[0]} ({pizza[1]})")
+                if row['ingredient'] not in ingredient_ids:
+                    raise ValueError(f"Recipe for {pizza[0]} uses unknown ingredient: {row['ingredient']}")
+                lines.append((pizza_ids[pizza], ingredient_ids[row['ingredient']], int(row.get('quantity') or 1)))
+
+            cursor.executemany('INSERT OR IGNORE INTO temp.catalog_import_pizzas (pizza_id) VALUES (?)',
+                               {(pizza_id,) for pizza_id, _, _ in lines})
+            cursor.execute('''
+                DELETE FROM pizza_ingredients
+                WHERE pizza_id IN (SELECT pizza_id FROM temp.catalog_import_pizzas)
+            ''')
+            cursor.executemany('INSERT INTO pizza_ingredients (pizza_id, ingredient_id, quantity) VALUES (?, ?, ?)',
+                               lines)
+
+            # Pizzas using an imported ingredient may have a new price or flag too
+            cursor.executemany('''
+                INSERT OR IGNORE INTO temp.catalog_import_pizzas (pizza_id)
+                SELECT pizza_id FROM pizza_ingredients WHERE ingredient_id = ?
+            ''', [(ingredient_ids[name],) for name, _, _, _ in ingredients])
+            recomputed = recompute_pizzas(cursor, 'SELECT pizza_id FROM temp.catalog_import_pizzas')
+            cursor.execute('DELETE FROM temp.catalog_import_pizzas')
+
+        if ingredients or pizzas or lines:
+            cursor.execute('UPDATE catalog_version SET version = version + 1 WHERE id = 1')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    return {
+        'ingredients': len(ingredients),
+        'pizzas_created': len(created),
+        'pizzas_updated': len(updated),
+        'recipe_lines': len(lines),
+        'pizzas_recomputed': recomputed,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def recompute_pizzas(cursor, pizza_ids):
+    """Re-derive is_vegetarian and the cached price of the pizzas selected by the query pizza_ids.
+
+    The set-based equivalent of update_pizza_vegetarian_status_* and
+    pizza_price_cache_recipe_*; returns how many pizzas were recomputed.
+    """
+    cursor.execute(f'''
+        UPDATE pizzas
+        SET is_vegetarian = COALESCE((
+            SELECT MIN(i.is_vegetarian)
+            FROM pizza_ingredients r
+            JOIN ingredients i ON r.ingredient_id = i.ingredient_id
+            WHERE r.pizza_id = pizzas.pizza_id
+        ), 0)
+        WHERE pizza_id IN ({pizza_ids})
+    ''')
+    recomputed = cursor.rowcount
+    cursor.execute(PIZZA_PRICE_REFRESH.format(where=f'pi.pizza_id IN ({pizza_ids})'))
+    # Pizzas left without ingredients drop out of the cache, as with the triggers
+    cursor.execute(f'''
+        DELETE FROM pizza_price_cache
+        WHERE pizza_id IN ({pizza_ids})
+        AND NOT EXISTS (SELECT 1 FROM pizza_ingredients WHERE pizza_id = pizza_price_cache.pizza_id)
+    ''')
+    return recomputed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', nargs='?', default='pizza_shop.db')
+    parser.add_argument('--json', help='catalog as one JSON document')
+    parser.add_argument('--ingredients', help='CSV: name,cost,is_vegetarian,is_vegan')
+    parser.add_argument('--pizzas', help='CSV: name,description,size,category')
+    parser.add_argument('--recipes', help='CSV: pizza,size,ingredient,quantity')
+    args = parser.parse_args()
+
+    if args.json:
+        catalog = read_catalog_json(args.json)
+    else:
+        catalog = read_catalog_csv(args.ingredients, args.pizzas, args.recipes)
+
+    db = Database(args.db_path)
+    with db.connection() as conn:
+        result = import_catalog(conn, catalog)
+    db.pool.close_all()
+    print(f"Imported {result['ingredients']} ingredients, {result['pizzas_created']} new and "
+          f"{result['pizzas_updated']} updated pizzas and {result['recipe_lines']} recipe lines "
+          f"in {result['seconds']:.2f} s ({result['pizzas_recomputed']} pizzas recomputed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,741 +1,1616 @@
-import sqlite3
-import datetime
-from datetime import date, timedelta
-
-class Database:
-    def __init__(self, db_name="pizza_shop.db"):
-        self.db_name = db_name
-        self.init_database()
-    
-    def get_connection(self):
-        return sqlite3.connect(self.db_name)
-    
-    def init_database(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Enable foreign keys
-        cursor.execute('PRAGMA foreign_keys = ON')
-
-        # Set timezone to Europe/Amsterdam for the connection
-        cursor.execute("PRAGMA timezone = 'Europe/Amsterdam'")
-        
-        # Drop tables if they exist (for development)
-        cursor.executescript('''
-            DROP TABLE IF EXISTS order_cancellations;
-            DROP TABLE IF EXISTS order_items;
-            DROP TABLE IF EXISTS pizza_ingredients;
-            DROP TABLE IF EXISTS area_coverage;
-            DROP TABLE IF EXISTS orders;
-            DROP TABLE IF EXISTS discount_codes;
-            DROP TABLE IF EXISTS customers;
-            DROP TABLE IF EXISTS pizzas;
-            DROP TABLE IF EXISTS ingredients;
-            DROP TABLE IF EXISTS drinks;
-            DROP TABLE IF EXISTS desserts;
-            DROP TABLE IF EXISTS delivery_persons;
-            
-            -- Drop triggers if they exist
-            DROP TRIGGER IF EXISTS check_vegetarian_pizza_insert;
-            DROP TRIGGER IF EXISTS check_vegetarian_pizza_update;
-            DROP TRIGGER IF EXISTS validate_customer_age_insert;
-            DROP TRIGGER IF EXISTS validate_customer_age_update;
-            DROP TRIGGER IF EXISTS prevent_discount_reuse;
-            DROP TRIGGER IF EXISTS validate_order_has_pizza;
-            DROP TRIGGER IF EXISTS update_pizza_vegetarian_status_insert;
-            DROP TRIGGER IF EXISTS update_pizza_vegetarian_status_delete;
-            DROP TRIGGER IF EXISTS update_pizza_vegetarian_status_update;
-            DROP TRIGGER IF EXISTS prevent_late_cancellation;
-            DROP TRIGGER IF EXISTS ensure_unique_discount_codes;
-            DROP TRIGGER IF EXISTS validate_order_total;
-        ''')
-        
-        # Create tables with enhanced constraints
-        cursor.executescript('''
-            -- Customers table with age validation
-            CREATE TABLE customers (
-                customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT NOT NULL,
-                address TEXT NOT NULL,
-                postal_code TEXT NOT NULL CHECK(length(postal_code) >= 4),
-                birth_date DATE NOT NULL,
-                gender TEXT CHECK(gender IN ('Male', 'Female', 'Other')) NOT NULL,
-                total_pizzas_ordered INTEGER DEFAULT 0 CHECK(total_pizzas_ordered >= 0),
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Ingredients table with strict cost validation
-            CREATE TABLE ingredients (
-                ingredient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                cost DECIMAL(10,2) NOT NULL CHECK(cost > 0 AND cost < 100),
-                is_vegetarian BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegetarian IN (0, 1)),
-                is_vegan BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegan IN (0, 1))
-            );
-            
-            -- Pizzas table
-            CREATE TABLE pizzas (
-                pizza_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                size TEXT NOT NULL CHECK(size IN ('Small', 'Medium', 'Large')) DEFAULT 'Medium',
-                category TEXT NOT NULL CHECK(category IN ('Classic', 'Specialty', 'Premium')) DEFAULT 'Classic',
-                is_vegetarian BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegetarian IN (0, 1))
-            );
-            
-            -- Pizza-Ingredients junction table with quantity validation
-            CREATE TABLE pizza_ingredients (
-                pizza_id INTEGER NOT NULL,
-                ingredient_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL CHECK(quantity > 0 AND quantity <= 10) DEFAULT 1,
-                PRIMARY KEY (pizza_id, ingredient_id),
-                FOREIGN KEY (pizza_id) REFERENCES pizzas(pizza_id) ON DELETE CASCADE,
-                FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
-            );
-            
-            -- Drinks table
-            CREATE TABLE drinks (
-                drink_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                price DECIMAL(10,2) NOT NULL CHECK(price > 0 AND price < 50),
-                size TEXT NOT NULL CHECK(size IN ('Small', 'Medium', 'Large')) DEFAULT 'Medium'
-            );
-            
-            -- Desserts table
-            CREATE TABLE desserts (
-                dessert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                price DECIMAL(10,2) NOT NULL CHECK(price > 0 AND price < 50)
-            );
-            
-            -- Delivery persons table
-            CREATE TABLE delivery_persons (
-                driver_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                is_available BOOLEAN NOT NULL DEFAULT 1 CHECK(is_available IN (0, 1)),
-                last_delivery_time TIMESTAMP,
-                current_location TEXT,
-                vehicle_type TEXT NOT NULL CHECK(vehicle_type IN ('Bike', 'Scooter', 'Car')) DEFAULT 'Bike'
-            );
-            
-            -- Area coverage table
-            CREATE TABLE area_coverage (
-                driver_id INTEGER NOT NULL,
-                postal_code TEXT NOT NULL CHECK(length(postal_code) >= 4),
-                area_name TEXT NOT NULL,
-                delivery_time_minutes INTEGER NOT NULL CHECK(delivery_time_minutes > 0 AND delivery_time_minutes <= 120) DEFAULT 25,
-                PRIMARY KEY (driver_id, postal_code),
-                FOREIGN KEY (driver_id) REFERENCES delivery_persons(driver_id) ON DELETE CASCADE
-            );
-            
-            -- Discount codes table with strict constraints
-            CREATE TABLE discount_codes (
-                code_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                code TEXT UNIQUE NOT NULL CHECK(length(code) >= 4),
-                discount_percent INTEGER NOT NULL CHECK(discount_percent BETWEEN 1 AND 100),
-                is_used BOOLEAN NOT NULL DEFAULT 0 CHECK(is_used IN (0, 1)),
-                used_by_customer_id INTEGER,
-                expiry_date DATE NOT NULL,
-                FOREIGN KEY (used_by_customer_id) REFERENCES customers(customer_id)
-            );
-            
-            -- Orders table with comprehensive constraints
-            CREATE TABLE orders (
-                order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER NOT NULL,
-                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-                total_amount DECIMAL(10,2) NOT NULL CHECK(total_amount >= 0 AND total_amount < 1000),
-                status TEXT NOT NULL CHECK(status IN ('Pending', 'Preparing', 'Out for Delivery', 'Delivered', 'Cancelled')) DEFAULT 'Pending',
-                delivery_person_id INTEGER,
-                discount_applied DECIMAL(10,2) NOT NULL DEFAULT 0 CHECK(discount_applied >= 0),
-                estimated_delivery_time TIMESTAMP,
-                actual_delivery_time TIMESTAMP,
-                delivery_notes TEXT,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
-                FOREIGN KEY (delivery_person_id) REFERENCES delivery_persons(driver_id),
-                CHECK (actual_delivery_time IS NULL OR actual_delivery_time >= order_date),
-                CHECK (estimated_delivery_time IS NULL OR estimated_delivery_time >= order_date)
-            );
-            
-            -- Order items table with strict validation
-            CREATE TABLE order_items (
-                order_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                item_type TEXT NOT NULL CHECK(item_type IN ('pizza', 'drink', 'dessert')),
-                item_id INTEGER NOT NULL,
-                quantity INTEGER NOT NULL CHECK(quantity > 0 AND quantity <= 20),
-                price_at_time DECIMAL(10,2) NOT NULL CHECK(price_at_time > 0),
-                FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE CASCADE
-            );
-            
-            -- Order cancellations table for tracking cancellations
-            CREATE TABLE order_cancellations (
-                cancellation_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                cancelled_by TEXT NOT NULL,
-                cancellation_type TEXT NOT NULL CHECK(cancellation_type IN ('customer', 'staff')),
-                cancellation_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                reason TEXT,
-                FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE CASCADE
-            );
-        ''')
-        
-        # Create custom constraints and triggers
-        self.create_constraints_and_triggers(cursor)
-        
-        # Insert sample data
-        self.insert_sample_data(cursor)
-        
-        # Create views
-        self.create_views(cursor)
-        
-        conn.commit()
-        conn.close()
-    
-    def create_constraints_and_triggers(self, cursor):
-        """Create custom constraints and triggers for business rules"""
-        
-        # Trigger 1: Ensure vegetarian pizzas don't contain meat
-        cursor.execute('''
-            CREATE TRIGGER check_vegetarian_pizza_insert
-            BEFORE INSERT ON pizza_ingredients
-            FOR EACH ROW
-            WHEN (
-                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
-            ) = 1
-            BEGIN
-                SELECT CASE
-                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
-                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
-                END;
-            END;
-        ''')
-        
-        cursor.execute('''
-            CREATE TRIGGER check_vegetarian_pizza_update
-            BEFORE UPDATE ON pizza_ingredients
-            FOR EACH ROW
-            WHEN (
-                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
-            ) = 1
-            BEGIN
-                SELECT CASE
-                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
-                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
-                END;
-            END;
-        ''')
-        
-        # Trigger 2: Validate customer age (at least 13 years old)
-        cursor.execute('''
-            CREATE TRIGGER validate_customer_age_insert
-            BEFORE INSERT ON customers
-            FOR EACH ROW
-            BEGIN
-                SELECT CASE
-                    WHEN date(NEW.birth_date) > date('now', '-13 years')
-                    THEN RAISE(ABORT, 'Customer must be at least 13 years old')
-                END;
-            END;
-        ''')
-        
-        cursor.execute('''
-            CREATE TRIGGER validate_customer_age_update
-            BEFORE UPDATE ON customers
-            FOR EACH ROW
-            BEGIN
-                SELECT CASE
-                    WHEN date(NEW.birth_date) > date('now', '-13 years')
-                    THEN RAISE(ABORT, 'Customer must be at least 13 years old')
-                END;
-            END;
-        ''')
-        
-        # Trigger 3: Prevent discount code reuse
-        cursor.execute('''
-            CREATE TRIGGER prevent_discount_reuse
-            BEFORE UPDATE ON discount_codes
-            FOR EACH ROW
-            WHEN NEW.is_used = 1 AND OLD.is_used = 0
-            BEGIN
-                -- Check if this code is already used by someone else
-                SELECT CASE
-                    WHEN EXISTS (
-                        SELECT 1 FROM discount_codes 
-                        WHERE code = NEW.code AND is_used = 1 AND code_id != NEW.code_id
-                    )
-                    THEN RAISE(ABORT, 'Discount code has already been used')
-                END;
-            END;
-        ''')
-        
-        # Trigger 4: Ensure at least one pizza per order - FIXED: Use CASE instead of IF
-        cursor.execute('''
-            CREATE TRIGGER validate_order_has_pizza
-            AFTER INSERT ON order_items
-            FOR EACH ROW
-            WHEN (SELECT COUNT(*) FROM order_items WHERE order_id = NEW.order_id AND item_type = 'pizza') = 0
-            BEGIN
-                -- Delete the invalid order
-                DELETE FROM orders WHERE order_id = NEW.order_id;
-                SELECT RAISE(ABORT, 'Order must contain at least one pizza');
-            END;
-        ''')
-        
-        # Trigger 5: Update pizza vegetarian status automatically
-        cursor.execute('''
-            CREATE TRIGGER update_pizza_vegetarian_status_insert
-            AFTER INSERT ON pizza_ingredients
-            FOR EACH ROW
-            BEGIN
-                UPDATE pizzas 
-                SET is_vegetarian = (
-                    SELECT CASE 
-                        WHEN COUNT(*) = 0 THEN 0
-                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
-                        ELSE 0
-                    END
-                    FROM pizza_ingredients pi
-                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
-                    WHERE pi.pizza_id = NEW.pizza_id
-                )
-                WHERE pizza_id = NEW.pizza_id;
-            END;
-        ''')
-        
-        cursor.execute('''
-            CREATE TRIGGER update_pizza_vegetarian_status_delete
-            AFTER DELETE ON pizza_ingredients
-            FOR EACH ROW
-            BEGIN
-                UPDATE pizzas 
-                SET is_vegetarian = (
-                    SELECT CASE 
-                        WHEN COUNT(*) = 0 THEN 0
-                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
-                        ELSE 0
-                    END
-                    FROM pizza_ingredients pi
-                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
-                    WHERE pi.pizza_id = OLD.pizza_id
-                )
-                WHERE pizza_id = OLD.pizza_id;
-            END;
-        ''')
-        
-        cursor.execute('''
-            CREATE TRIGGER update_pizza_vegetarian_status_update
-            AFTER UPDATE ON pizza_ingredients
-            FOR EACH ROW
-            BEGIN
-                UPDATE pizzas 
-                SET is_vegetarian = (
-                    SELECT CASE 
-                        WHEN COUNT(*) = 0 THEN 0
-                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
-                        ELSE 0
-                    END
-                    FROM pizza_ingredients pi
-                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
-                    WHERE pi.pizza_id = NEW.pizza_id
-                )
-                WHERE pizza_id = NEW.pizza_id;
-            END;
-        ''')
-        
-        # Trigger 6: Prevent order cancellation after 5 minutes
-        cursor.execute('''
-            CREATE TRIGGER prevent_late_cancellation
-            BEFORE UPDATE OF status ON orders
-            FOR EACH ROW
-            WHEN NEW.status = 'Cancelled' AND OLD.status != 'Cancelled'
-            BEGIN
-                SELECT CASE
-                    WHEN datetime('now') > datetime(OLD.order_date, '+5 minutes')
-                    THEN RAISE(ABORT, 'Orders can only be cancelled within 5 minutes of placement')
-                END;
-            END;
-        ''')
-        
-        # Trigger 7: Ensure unique discount codes (enhanced)
-        cursor.execute('''
-            CREATE TRIGGER ensure_unique_discount_codes
-            BEFORE INSERT ON discount_codes
-            FOR EACH ROW
-            BEGIN
-                SELECT CASE
-                    WHEN EXISTS (SELECT 1 FROM discount_codes WHERE code = NEW.code)
-                    THEN RAISE(ABORT, 'Discount code must be unique')
-                END;
-            END;
-        ''')
-        
-        # Trigger 8: Validate order total amount
-        cursor.execute('''
-            CREATE TRIGGER validate_order_total
-            BEFORE INSERT ON orders
-            FOR EACH ROW
-            BEGIN
-                SELECT CASE
-                    WHEN NEW.total_amount < 0 
-                    THEN RAISE(ABORT, 'Order total cannot be negative')
-                    WHEN NEW.total_amount > 1000
-                    THEN RAISE(ABORT, 'Order total cannot exceed 1000')
-                END;
-            END;
-        ''')
-        
-        # Create indexes for performance
-        cursor.executescript('''
-            CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON orders(customer_id, order_date);
-            CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status, order_date);
-            CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
-            CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
-            CREATE INDEX IF NOT EXISTS idx_pizza_ingredients_pizza_id ON pizza_ingredients(pizza_id);
-            CREATE INDEX IF NOT EXISTS idx_area_coverage_postal_code ON area_coverage(postal_code);
-            CREATE INDEX IF NOT EXISTS idx_order_cancellations_order_id ON order_cancellations(order_id);
-            CREATE INDEX IF NOT EXISTS idx_orders_delivery_person ON orders(delivery_person_id);
-            CREATE INDEX IF NOT EXISTS idx_customers_postal_code ON customers(postal_code);
-        ''')
-
-    def insert_sample_data(self, cursor):    
-        # Disable the vegetarian check triggers temporarily
-        cursor.execute('DROP TRIGGER IF EXISTS check_vegetarian_pizza_insert')
-        cursor.execute('DROP TRIGGER IF EXISTS check_vegetarian_pizza_update')
-        
-        local_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Insert ingredients with valid costs
-        ingredients = [
-            ('Tomato Sauce', 0.5, 1, 1),
-            ('Mozzarella Cheese', 1.2, 1, 0),
-            ('Pepperoni', 1.5, 0, 0),
-            ('Mushrooms', 0.8, 1, 1),
-            ('Green Peppers', 0.7, 1, 1),
-            ('Onions', 0.6, 1, 1),
-            ('Black Olives', 0.9, 1, 1),
-            ('Sausage', 1.4, 0, 0),
-            ('Bacon', 1.6, 0, 0),
-            ('Ham', 1.3, 0, 0),
-            ('Pineapple', 0.9, 1, 1),
-            ('Fresh Basil', 0.5, 1, 1),
-            ('Vegan Cheese', 1.8, 1, 1)
-        ]
-        cursor.executemany(
-            'INSERT INTO ingredients (name, cost, is_vegetarian, is_vegan) VALUES (?, ?, ?, ?)',
-            ingredients
-        )
-
-        # Insert pizzas (set all as non-vegetarian initially)
-        pizzas = [
-            ('Margherita', 'Classic tomato and cheese', 'Medium', 'Classic', 0),
-            ('Pepperoni', 'Pepperoni and cheese', 'Medium', 'Classic', 0),
-            ('Vegetarian', 'Mixed vegetables', 'Medium', 'Classic', 0),
-            ('Hawaiian', 'Ham and pineapple', 'Medium', 'Classic', 0),
-            ('Meat Lovers', 'All meat toppings', 'Large', 'Premium', 0),
-            ('Vegan Special', 'Vegan cheese and vegetables', 'Medium', 'Specialty', 0),
-            ('BBQ Chicken', 'BBQ sauce with chicken', 'Large', 'Premium', 0),
-            ('Four Cheese', 'Four cheese blend', 'Medium', 'Classic', 0),
-            ('Mushroom Delight', 'Extra mushrooms', 'Medium', 'Classic', 0),
-            ('Spicy Italian', 'Spicy sausage and peppers', 'Medium', 'Specialty', 0)
-        ]
-        cursor.executemany(
-            'INSERT INTO pizzas (name, description, size, category, is_vegetarian) VALUES (?, ?, ?, ?, ?)',
-            pizzas
-        )
-
-        # Insert pizza ingredients - now all should work
-        pizza_ingredients = [
-            # Margherita
-            (1, 1), (1, 2), (1, 12),
-            # Pepperoni
-            (2, 1), (2, 2), (2, 3),
-            # Vegetarian
-            (3, 1), (3, 2), (3, 4), (3, 5), (3, 6), (3, 7),
-            # Hawaiian
-            (4, 1), (4, 2), (4, 10), (4, 11),
-            # Meat Lovers
-            (5, 1), (5, 2), (5, 3), (5, 8), (5, 9),
-            # Vegan Special
-            (6, 1), (6, 13), (6, 4), (6, 5), (6, 6),
-            # BBQ Chicken
-            (7, 1), (7, 2), (7, 8),
-            # Four Cheese
-            (8, 1), (8, 2), (8, 13),
-            # Mushroom Delight
-            (9, 1), (9, 2), (9, 4),
-            # Spicy Italian
-            (10, 1), (10, 2), (10, 8), (10, 5)
-        ]
-
-        cursor.executemany(
-            'INSERT INTO pizza_ingredients (pizza_id, ingredient_id) VALUES (?, ?)',
-            pizza_ingredients
-        )
-
-        # The rest of your insert methods remain the same...
-        # Insert drinks
-        drinks = [
-            ('Coca-Cola', 2.5, 'Medium'),
-            ('Sprite', 2.5, 'Medium'),
-            ('Water', 1.5, 'Medium'),
-            ('Orange Juice', 3.0, 'Medium'),
-            ('Beer', 4.5, 'Medium')
-        ]
-        cursor.executemany(
-            'INSERT INTO drinks (name, price, size) VALUES (?, ?, ?)',
-            drinks
-        )
-
-        # Insert desserts
-        desserts = [
-            ('Tiramisu', 4.5),
-            ('Chocolate Cake', 3.5),
-            ('Ice Cream', 3.0),
-            ('Cheesecake', 4.0)
-        ]
-        cursor.executemany(
-            'INSERT INTO desserts (name, price) VALUES (?, ?)',
-            desserts
-        )
-
-        # Insert delivery persons
-        delivery_persons = [
-            ('Jan de Vries', '+31 6 12345678', 1, None, 'City Center', 'Bike'),
-            ('Lisa Jansen', '+31 6 23456789', 1, None, 'Wyck', 'Scooter'),
-            ('Mohammed Ali', '+31 6 34567890', 1, None, 'Caberg', 'Car'),
-            ('Anna Schmidt', '+31 6 45678901', 1, None, 'Malberg', 'Bike'),
-            ('Tom Bakker', '+31 6 56789012', 1, None, 'Brusselsepoort', 'Scooter')
-        ]
-        cursor.executemany(
-            'INSERT INTO delivery_persons (name, phone, is_available, last_delivery_time, current_location, vehicle_type) VALUES (?, ?, ?, ?, ?, ?)',
-            delivery_persons
-        )
-
-        # Insert area coverage
-        area_coverage = [
-            (1, '6211', 'City Center - Markt', 15),
-            (1, '6212', 'City Center - Vrijthof', 15),
-            (1, '6213', 'City Center - Boschstraat', 18),
-            (2, '6221', 'Wyck - Station', 20),
-            (2, '6222', 'Wyck - Maasboulevard', 22),
-            (2, '6223', 'Wyck - Rechtstraat', 25),
-            (3, '6217', 'Caberg', 30),
-            (3, '6218', 'Daalhof', 28),
-            (3, '6219', 'Mariaberg', 35),
-            (4, '6215', 'Malberg', 25),
-            (4, '6216', 'Malpertuis', 28),
-            (4, '6224', 'Nazareth', 32),
-            (5, '6214', 'Brusselsepoort', 22),
-            (5, '6225', 'Amby', 35),
-            (5, '6226', 'Heugem', 30),
-            (5, '6227', 'Randwyck', 25),
-            (5, '6228', 'Heer', 40),
-            (5, '6229', 'Borgharen', 45)
-        ]
-        cursor.executemany(
-            'INSERT INTO area_coverage (driver_id, postal_code, area_name, delivery_time_minutes) VALUES (?, ?, ?, ?)',
-            area_coverage
-        )
-
-        # Insert discount codes with future expiry dates
-        future_date = (datetime.datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
-        discount_codes = [
-            ('WELCOME10', 10, 0, None, future_date),
-            ('PIZZALOVER', 15, 0, None, future_date),
-            ('SAVE20', 20, 0, None, future_date),
-            ('MAASTRICHT25', 25, 0, None, future_date)
-        ]
-        cursor.executemany(
-            'INSERT INTO discount_codes (code, discount_percent, is_used, used_by_customer_id, expiry_date) VALUES (?, ?, ?, ?, ?)',
-            discount_codes
-        )
-
-        # Insert sample customers with valid birth dates (at least 13 years old)
-        customers = [
-            ('Emma van Dijk', 'emma@email.com', '+31 6 11111111', 'Vrijthof 25', '6211', '1990-05-15', 'Female', 5),
-            ('Lucas Jansen', 'lucas@email.com', '+31 6 22222222', 'Stationstraat 12', '6221', '1985-08-22', 'Male', 12),
-            ('Sophie de Wit', 'sophie@email.com', '+31 6 33333333', 'Cabergerweg 8', '6217', '1995-02-10', 'Female', 8),
-            ('Thomas Maas', 'thomas@email.com', '+31 6 44444444', 'Malbergweg 15', '6215', '1988-11-30', 'Male', 3),
-            ('Isabelle Horn', 'isabelle@email.com', '+31 6 55555555', 'Brusselsepoort 42', '6214', '1992-07-18', 'Female', 7)
-        ]
-        cursor.executemany(
-            'INSERT INTO customers (name, email, phone, address, postal_code, birth_date, gender, total_pizzas_ordered) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-            customers
-        )
-
-        # Re-create the vegetarian check triggers after sample data is inserted
-        cursor.execute('''
-            CREATE TRIGGER check_vegetarian_pizza_insert
-            BEFORE INSERT ON pizza_ingredients
-            FOR EACH ROW
-            WHEN (
-                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
-            ) = 1
-            BEGIN
-                SELECT CASE
-                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
-                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
-                END;
-            END;
-        ''')
-
-        cursor.execute('''
-            CREATE TRIGGER check_vegetarian_pizza_update
-            BEFORE UPDATE ON pizza_ingredients
-            FOR EACH ROW
-            WHEN (
-                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
-            ) = 1
-            BEGIN
-                SELECT CASE
-                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
-                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
-                END;
-            END;
-        ''')
-
-        
-    
-    def create_views(self, cursor):
-        # View for pizza prices with dynamic calculation
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS pizza_prices AS
-            SELECT 
-                p.pizza_id,
-                p.name,
-                p.size,
-                p.category,
-                SUM(i.cost) as base_cost,
-                ROUND((SUM(i.cost) * 1.4) * 1.09, 2) as final_price,
-                p.is_vegetarian,
-                CASE 
-                    WHEN SUM(CASE WHEN i.is_vegan = 0 THEN 1 ELSE 0 END) = 0 THEN 1 
-                    ELSE 0 
-                END as is_vegan
-            FROM pizzas p
-            JOIN pizza_ingredients pi ON p.pizza_id = pi.pizza_id
-            JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
-            GROUP BY p.pizza_id
-        ''')
-        
-        # View for menu items
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS menu_view AS
-            SELECT 
-                'pizza' as item_type,
-                pizza_id as item_id,
-                name,
-                final_price as price,
-                size,
-                is_vegetarian,
-                is_vegan
-            FROM pizza_prices
-            UNION ALL
-            SELECT 
-                'drink' as item_type,
-                drink_id as item_id,
-                name,
-                price,
-                size,
-                0 as is_vegetarian,
-                0 as is_vegan
-            FROM drinks
-            UNION ALL
-            SELECT 
-                'dessert' as item_type,
-                dessert_id as item_id,
-                name,
-                price,
-                '' as size,
-                0 as is_vegetarian,
-                0 as is_vegan
-            FROM desserts
-        ''')
-        
-        # View for delivery assignments
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS delivery_assignments AS
-            SELECT 
-                o.order_id,
-                o.customer_id,
-                c.name as customer_name,
-                c.address,
-                c.postal_code,
-                o.total_amount,
-                o.status,
-                o.delivery_person_id,
-                dp.name as delivery_person_name,
-                dp.phone as delivery_phone,
-                dp.vehicle_type,
-                ac.area_name,
-                ac.delivery_time_minutes,
-                o.estimated_delivery_time,
-                o.actual_delivery_time,
-                o.order_date
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            LEFT JOIN delivery_persons dp ON o.delivery_person_id = dp.driver_id
-            LEFT JOIN area_coverage ac ON (dp.driver_id = ac.driver_id AND c.postal_code = ac.postal_code)
-        ''')
-
-        # View for order cancellation eligibility
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS order_cancellation_eligibility AS
-            SELECT 
-                order_id,
-                customer_id,
-                order_date,
-                status,
-                CASE 
-                    WHEN datetime('now') <= datetime(order_date, '+5 minutes') 
-                    THEN 1 
-                    ELSE 0 
-                END as can_cancel,
-                datetime(order_date, '+5 minutes') as cancellation_deadline
-            FROM orders
-            WHERE status IN ('Pending', 'Preparing')
-        ''')
-
-        # View for real-time inventory tracking
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS ingredient_usage AS
-            SELECT 
-                i.ingredient_id,
-                i.name,
-                i.cost,
-                COALESCE(SUM(pi.quantity * oi.quantity), 0) as total_used,
-                i.cost * COALESCE(SUM(pi.quantity * oi.quantity), 0) as total_cost
-            FROM ingredients i
-            LEFT JOIN pizza_ingredients pi ON i.ingredient_id = pi.ingredient_id
-            LEFT JOIN order_items oi ON pi.pizza_id = oi.item_id AND oi.item_type = 'pizza'
-            LEFT JOIN orders o ON oi.order_id = o.order_id
-            WHERE o.order_date >= date('now', '-7 days')
-            GROUP BY i.ingredient_id, i.name, i.cost
-        ''')
-
-        # View for customer loyalty tiers
-        cursor.execute('''
-            CREATE VIEW IF NOT EXISTS customer_loyalty_tiers AS
-            SELECT 
-                customer_id,
-                name,
-                total_pizzas_ordered,
-                CASE 
-                    WHEN total_pizzas_ordered >= 20 THEN 'Gold'
-                    WHEN total_pizzas_ordered >= 10 THEN 'Silver'
-                    WHEN total_pizzas_ordered >= 5 THEN 'Bronze'
-                    ELSE 'New'
-                END as loyalty_tier,
-                CASE 
-                    WHEN total_pizzas_ordered >= 20 THEN 15
-                    WHEN total_pizzas_ordered >= 10 THEN 10
-                    WHEN total_pizzas_ordered >= 5 THEN 5
-                    ELSE 0
-                END as loyalty_discount_percent
-            FROM customers
-            WHERE total_pizzas_ordered > 0
-        ''')
\ No newline at end of file
+import sqlite3
+import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from profiler import ProfilingConnection, QueryProfiler
+from reports import OrderBreakdown
+
+# Ordered schema migrations: (version, description, Database method name).
+# Each step runs once, in its own transaction, and is recorded in schema_version.
+# Steps must be idempotent so databases created before versioning was introduced
+# (tables present, no schema_version table) upgrade in place without data loss.
+MIGRATIONS = [
+    (1, 'Baseline schema, triggers, indexes, sample data and views', 'migrate_baseline_schema'),
+    (2, 'Trigger-maintained pizza_price_cache behind the pizza_prices view', 'migrate_pizza_price_cache'),
+    (3, 'catalog_version counter bumped on every menu data change', 'migrate_catalog_version'),
+    (4, 'Trigger-maintained daily_sales_rollup for period revenue reports', 'migrate_daily_sales_rollup'),
+    (5, 'Birthday discount flag on orders and indexed birth_md on customers', 'migrate_birthday_discounts'),
+    (6, 'Integer epoch timestamps on orders with (status, order_ts) and (customer_id, order_ts) indexes', 'migrate_epoch_timestamps'),
+    (7, 'Check orders for a pizza once per order in publish_order_items, not per order_items row', 'migrate_deferred_pizza_validation'),
+    (8, 'catalog_items name/price table for order_items joins and a covering (item_type, item_id) index', 'migrate_catalog_items'),
+    (9, 'order_generation counter bumped by every order/driver write transaction', 'migrate_order_generation'),
+]
+
+# orders text timestamp column -> integer epoch column kept in step with it
+EPOCH_COLUMNS = {
+    'order_date': 'order_ts',
+    'estimated_delivery_time': 'estimated_delivery_ts',
+    'actual_delivery_time': 'actual_delivery_ts',
+}
+
+# Tables whose changes can alter the menu; each bumps catalog_version
+CATALOG_TABLES = ('pizzas', 'ingredients', 'pizza_ingredients', 'drinks', 'desserts')
+
+# item_type -> (table, key column, name column, price column or expression
+# over {row}) of the items order_items can refer to; the price of a pizza
+# lives in pizza_price_cache and is set by its own triggers
+CATALOG_ITEM_SOURCES = {
+    'drink': ('drinks', 'drink_id', 'name', 'price'),
+    'dessert': ('desserts', 'dessert_id', 'name', 'price'),
+    'pizza': ('pizzas', 'pizza_id', 'name',
+              '(SELECT final_price FROM pizza_price_cache WHERE pizza_id = {row}.pizza_id)'),
+}
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def run_script(cursor, script):
+    """Execute a multi-statement SQL script statement by statement.
+
+    Unlike executescript(), this does not COMMIT first, so the statements
+    stay inside the caller's transaction.
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ''
+
+
+@contextmanager
+def suspended_triggers(cursor, names):
+    """Drop the named triggers for the duration of the block, then recreate them.
+
+    SQLite cannot disable a trigger, but DDL is transactional: run this
+    inside a write transaction and other connections never see the
+    triggers missing. The caller takes over whatever the triggers would
+    have done for the rows written meanwhile.
+    """
+    placeholders = ', '.join('?' * len(names))
+    cursor.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+                   tuple(names))
+    triggers = cursor.fetchall()
+    for name, _ in triggers:
+        cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        for _, sql in triggers:
+            cursor.execute(sql)
+
+
+# Connection-local staging table for publish_order_items(); created for every
+# pooled connection by Database.setup_connection
+ORDER_ITEMS_STAGING = '''
+    CREATE TEMP TABLE IF NOT EXISTS order_items_staging (
+        order_id INTEGER NOT NULL,
+        item_type TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        price_at_time DECIMAL(10,2) NOT NULL
+    )
+'''
+
+
+def publish_order_items(cursor, rows):
+    """Write order lines, checking each order once instead of once per line.
+
+    rows are (order_id, item_type, item_id, quantity, price_at_time), in
+    any line order and for any number of orders. When every order in rows
+    has a pizza line of its own they are inserted directly. Otherwise they
+    are staged in the connection's TEMP table, one set-based query checks
+    that every order they touch ends up with a pizza line (lines it
+    already has count), and only then are they copied into order_items
+    with one INSERT ... SELECT. Raises sqlite3.IntegrityError, publishing
+    nothing, if an order has no pizza. Run it inside the caller's write
+    transaction.
+    """
+    rows = list(rows)
+    orders = {row[0] for row in rows}
+    if orders == {row[0] for row in rows if row[1] == 'pizza'}:
+        cursor.executemany('''
+            INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        return
+
+    cursor.executemany('INSERT INTO temp.order_items_staging VALUES (?, ?, ?, ?, ?)', rows)
+    try:
+        cursor.execute('''
+            SELECT s.order_id FROM temp.order_items_staging s
+            GROUP BY s.order_id
+            HAVING MAX(s.item_type = 'pizza') = 0
+            AND NOT EXISTS (
+                SELECT 1 FROM order_items oi WHERE oi.order_id = s.order_id AND +oi.item_type = 'pizza'
+            )
+            LIMIT 1
+        ''')
+        if cursor.fetchone():
+            raise sqlite3.IntegrityError('Order must contain at least one pizza')
+        cursor.execute('''
+            INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time)
+            SELECT order_id, item_type, item_id, quantity, price_at_time
+            FROM temp.order_items_staging ORDER BY rowid
+        ''')
+    finally:
+        cursor.execute('DELETE FROM temp.order_items_staging')
+
+
+# Same pricing rule as the original pizza_prices view, for the pizzas matched
+# by {where}; used by the pizza_price_cache triggers and by catalog imports
+PIZZA_PRICE_REFRESH = '''
+                INSERT OR REPLACE INTO pizza_price_cache (pizza_id, base_cost, final_price, is_vegan)
+                SELECT 
+                    pi.pizza_id,
+                    SUM(i.cost),
+                    ROUND((SUM(i.cost) * 1.4) * 1.09, 2),
+                    CASE 
+                        WHEN SUM(CASE WHEN i.is_vegan = 0 THEN 1 ELSE 0 END) = 0 THEN 1 
+                        ELSE 0 
+                    END
+                FROM pizza_ingredients pi
+                JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+                WHERE {where}
+                GROUP BY pi.pizza_id;
+'''
+
+
+# Age group of customer {c} in the year of order {o}, as daily_sales_rollup stores it
+ROLLUP_AGE_GROUP = '''CASE 
+                    WHEN (strftime('%Y', {o}.order_date) - strftime('%Y', {c}.birth_date)) < 25 THEN 'Under 25'
+                    WHEN (strftime('%Y', {o}.order_date) - strftime('%Y', {c}.birth_date)) BETWEEN 25 AND 40 THEN '25-40'
+                    ELSE 'Over 40'
+                END'''
+
+
+def add_orders_to_daily_rollup(cursor, condition='1', params=()):
+    """Add the orders matching condition (on alias o) and their items to daily_sales_rollup.
+
+    The set-based equivalent of the insert triggers, for rows written
+    while those were suspended; cancelled orders are skipped.
+    """
+    age_group = ROLLUP_AGE_GROUP.format(o='o', c='c')
+    on_conflict = '''
+        ON CONFLICT (item_type, day, item_id, postal_code, gender, age_group) DO UPDATE SET
+            order_count = order_count + excluded.order_count,
+            quantity = quantity + excluded.quantity,
+            revenue = revenue + excluded.revenue
+    '''
+    cursor.execute(f'''
+        INSERT INTO daily_sales_rollup 
+            (day, item_type, item_id, postal_code, gender, age_group, order_count, quantity, revenue)
+        SELECT date(o.order_date), 'order', 0, c.postal_code, c.gender, {age_group},
+               COUNT(*), 0, SUM(o.total_amount)
+        FROM orders o
+        JOIN customers c ON c.customer_id = o.customer_id
+        WHERE o.status != 'Cancelled' AND ({condition})
+        GROUP BY 1, 2, 3, 4, 5, 6
+        {on_conflict}
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO daily_sales_rollup 
+            (day, item_type, item_id, postal_code, gender, age_group, order_count, quantity, revenue)
+        SELECT date(o.order_date), oi.item_type, oi.item_id, c.postal_code, c.gender, {age_group},
+               0, SUM(oi.quantity), SUM(oi.quantity * oi.price_at_time)
+        FROM order_items oi
+        JOIN orders o ON o.order_id = oi.order_id
+        JOIN customers c ON c.customer_id = o.customer_id
+        WHERE o.status != 'Cancelled' AND ({condition})
+        GROUP BY 1, 2, 3, 4, 5, 6
+        {on_conflict}
+    ''', params)
+
+
+def bump_order_generation(cursor):
+    """Count one more write transaction on orders or drivers; returns (previous, new) generation.
+
+    Run it inside the caller's write transaction, which already holds the
+    write lock, so previous is the generation the last writer committed.
+    """
+    cursor.execute('SELECT generation FROM order_generation WHERE id = 1')
+    previous = cursor.fetchone()[0]
+    cursor.execute('UPDATE order_generation SET generation = ? WHERE id = 1', (previous + 1,))
+    return previous, previous + 1
+
+
+def read_order_generation(cursor):
+    cursor.execute('SELECT generation FROM order_generation WHERE id = 1')
+    return cursor.fetchone()[0]
+
+
+class PooledConnection:
+    """Handle to a pooled sqlite3 connection.
+
+    Behaves like the underlying sqlite3.Connection, except that close()
+    hands the connection back to its pool instead of closing it.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Bounded pool of sqlite3 connections with per-thread reuse.
+
+    A thread that already holds a connection gets the same one back from
+    nested acquire() calls (e.g. report helpers called from another report),
+    unless that connection is inside a transaction: nested callers then get a
+    separate connection so their commit/rollback cannot end the outer
+    transaction. setup(conn) runs once, when a connection is first opened;
+    factory is the sqlite3.Connection subclass connections are opened with.
+    """
+
+    def __init__(self, db_name, max_size=8, timeout=5.0, setup=None, health_check_after=30.0,
+                 factory=sqlite3.Connection):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.setup = setup
+        self.factory = factory
+        self.health_check_after = health_check_after
+        self._idle = []  # (connection, last released at), most recent last
+        self._size = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def acquire(self):
+        local = self._local
+        held = getattr(local, 'conn', None)
+        if held is not None and not held.in_transaction:
+            local.depth += 1
+            return PooledConnection(self, held)
+
+        conn = self._checkout()
+        if held is None:
+            local.conn = conn
+            local.depth = 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        local = self._local
+        if conn is getattr(local, 'conn', None):
+            local.depth -= 1
+            if local.depth:
+                return
+            local.conn = None
+        self._checkin(conn)
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... -- released on exit"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            conn.close()
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError('Timed out waiting for a pooled database connection')
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn, released_at = None, None
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    self._discard(None)
+                    raise
+
+            if time.monotonic() - released_at < self.health_check_after or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn):
+        try:
+            if conn.in_transaction:
+                # The borrower leaked an open transaction; never hand it on
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, factory=self.factory)
+        if self.setup:
+            self.setup(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+
+# PRAGMAs applied to every pooled connection, in this order. WAL lets dashboard
+# reads proceed while an order is being written; synchronous=NORMAL is durable
+# in WAL mode up to the last checkpointed commit. Override per Database with
+# Database(profile={...}), e.g. {'journal_mode': 'DELETE', 'synchronous': 'FULL'}.
+DEFAULT_CONNECTION_PROFILE = {
+    'busy_timeout': 5000,        # ms to wait for a lock before SQLITE_BUSY
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,        # negative = KiB, i.e. 16 MB page cache
+    'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+
+class Database:
+    def __init__(self, db_name="pizza_shop.db", pool_size=8, profile=None, profiler=None):
+        self.db_name = db_name
+        self.profile = dict(DEFAULT_CONNECTION_PROFILE, **(profile or {}))
+        # Every pooled connection reports to this profiler; pass
+        # QueryProfiler(enabled=False) to run without per-statement timing
+        self.profiler = profiler if profiler is not None else QueryProfiler()
+        self.pool = ConnectionPool(db_name, max_size=pool_size, setup=self.setup_connection,
+                                   factory=ProfilingConnection)
+        self.init_database()
+    
+    def get_connection(self):
+        """Check out a pooled connection; conn.close() returns it to the pool"""
+        return self.pool.acquire()
+    
+    def connection(self):
+        """Context-manager form of get_connection()"""
+        return self.pool.connection()
+    
+    def setup_connection(self, conn):
+        """Per-connection setup, run once when the pool opens a connection"""
+        cursor = conn.cursor()
+        
+        for pragma, value in self.profile.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+        # Set timezone to Europe/Amsterdam for the connection
+        cursor.execute("PRAGMA timezone = 'Europe/Amsterdam'")
+        cursor.execute(ORDER_ITEMS_STAGING)
+        cursor.close()
+        # Once per connection: registering it again expires prepared statements
+        # and fails while another statement on the connection is active
+        conn.create_aggregate('order_breakdown', 4, OrderBreakdown)
+
+        self.profiler.attach(conn)
+    
+    def init_database(self):
+        """Bring the schema up to date. On a current database this is one version check."""
+        conn = self.get_connection()
+        try:
+            if self.get_schema_version(conn) < LATEST_SCHEMA_VERSION:
+                self.migrate(conn)
+        finally:
+            conn.close()
+    
+    def get_schema_version(self, conn):
+        """Return the highest applied migration version (0 for an unversioned database)"""
+        try:
+            version = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0]
+        except sqlite3.OperationalError:
+            # schema_version does not exist yet
+            return 0
+        return version or 0
+    
+    def migrate(self, conn):
+        """Apply every pending migration in order, one transaction per step"""
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        
+        for version, description, step in MIGRATIONS:
+            # BEGIN IMMEDIATE takes the write lock before re-reading the version,
+            # so two processes starting together cannot apply the same step twice
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if self.get_schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                getattr(self, step)(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (version, description)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    def migrate_baseline_schema(self, cursor):
+        """Migration 1: the original schema, created only where missing"""
+        # Create tables with enhanced constraints
+        run_script(cursor, '''
+            -- Customers table with age validation
+            CREATE TABLE IF NOT EXISTS customers (
+                customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                phone TEXT NOT NULL,
+                address TEXT NOT NULL,
+                postal_code TEXT NOT NULL CHECK(length(postal_code) >= 4),
+                birth_date DATE NOT NULL,
+                gender TEXT CHECK(gender IN ('Male', 'Female', 'Other')) NOT NULL,
+                total_pizzas_ordered INTEGER DEFAULT 0 CHECK(total_pizzas_ordered >= 0),
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            
+            -- Ingredients table with strict cost validation
+            CREATE TABLE IF NOT EXISTS ingredients (
+                ingredient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                cost DECIMAL(10,2) NOT NULL CHECK(cost > 0 AND cost < 100),
+                is_vegetarian BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegetarian IN (0, 1)),
+                is_vegan BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegan IN (0, 1))
+            );
+            
+            -- Pizzas table
+            CREATE TABLE IF NOT EXISTS pizzas (
+                pizza_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                size TEXT NOT NULL CHECK(size IN ('Small', 'Medium', 'Large')) DEFAULT 'Medium',
+                category TEXT NOT NULL CHECK(category IN ('Classic', 'Specialty', 'Premium')) DEFAULT 'Classic',
+                is_vegetarian BOOLEAN NOT NULL DEFAULT 0 CHECK(is_vegetarian IN (0, 1))
+            );
+            
+            -- Pizza-Ingredients junction table with quantity validation
+            CREATE TABLE IF NOT EXISTS pizza_ingredients (
+                pizza_id INTEGER NOT NULL,
+                ingredient_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL CHECK(quantity > 0 AND quantity <= 10) DEFAULT 1,
+                PRIMARY KEY (pizza_id, ingredient_id),
+                FOREIGN KEY (pizza_id) REFERENCES pizzas(pizza_id) ON DELETE CASCADE,
+                FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
+            );
+            
+            -- Drinks table
+            CREATE TABLE IF NOT EXISTS drinks (
+                drink_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price DECIMAL(10,2) NOT NULL CHECK(price > 0 AND price < 50),
+                size TEXT NOT NULL CHECK(size IN ('Small', 'Medium', 'Large')) DEFAULT 'Medium'
+            );
+            
+            -- Desserts table
+            CREATE TABLE IF NOT EXISTS desserts (
+                dessert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price DECIMAL(10,2) NOT NULL CHECK(price > 0 AND price < 50)
+            );
+            
+            -- Delivery persons table
+            CREATE TABLE IF NOT EXISTS delivery_persons (
+                driver_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                is_available BOOLEAN NOT NULL DEFAULT 1 CHECK(is_available IN (0, 1)),
+                last_delivery_time TIMESTAMP,
+                current_location TEXT,
+                vehicle_type TEXT NOT NULL CHECK(vehicle_type IN ('Bike', 'Scooter', 'Car')) DEFAULT 'Bike'
+            );
+            
+            -- Area coverage table
+            CREATE TABLE IF NOT EXISTS area_coverage (
+                driver_id INTEGER NOT NULL,
+                postal_code TEXT NOT NULL CHECK(length(postal_code) >= 4),
+                area_name TEXT NOT NULL,
+                delivery_time_minutes INTEGER NOT NULL CHECK(delivery_time_minutes > 0 AND delivery_time_minutes <= 120) DEFAULT 25,
+                PRIMARY KEY (driver_id, postal_code),
+                FOREIGN KEY (driver_id) REFERENCES delivery_persons(driver_id) ON DELETE CASCADE
+            );
+            
+            -- Discount codes table with strict constraints
+            CREATE TABLE IF NOT EXISTS discount_codes (
+                code_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT UNIQUE NOT NULL CHECK(length(code) >= 4),
+                discount_percent INTEGER NOT NULL CHECK(discount_percent BETWEEN 1 AND 100),
+                is_used BOOLEAN NOT NULL DEFAULT 0 CHECK(is_used IN (0, 1)),
+                used_by_customer_id INTEGER,
+                expiry_date DATE NOT NULL,
+                FOREIGN KEY (used_by_customer_id) REFERENCES customers(customer_id)
+            );
+            
+            -- Orders table with comprehensive constraints
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id INTEGER NOT NULL,
+                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                total_amount DECIMAL(10,2) NOT NULL CHECK(total_amount >= 0 AND total_amount < 1000),
+                status TEXT NOT NULL CHECK(status IN ('Pending', 'Preparing', 'Out for Delivery', 'Delivered', 'Cancelled')) DEFAULT 'Pending',
+                delivery_person_id INTEGER,
+                discount_applied DECIMAL(10,2) NOT NULL DEFAULT 0 CHECK(discount_applied >= 0),
+                estimated_delivery_time TIMESTAMP,
+                actual_delivery_time TIMESTAMP,
+                delivery_notes TEXT,
+                FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
+                FOREIGN KEY (delivery_person_id) REFERENCES delivery_persons(driver_id),
+                CHECK (actual_delivery_time IS NULL OR actual_delivery_time >= order_date),
+                CHECK (estimated_delivery_time IS NULL OR estimated_delivery_time >= order_date)
+            );
+            
+            -- Order items table with strict validation
+            CREATE TABLE IF NOT EXISTS order_items (
+                order_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                item_type TEXT NOT NULL CHECK(item_type IN ('pizza', 'drink', 'dessert')),
+                item_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL CHECK(quantity > 0 AND quantity <= 20),
+                price_at_time DECIMAL(10,2) NOT NULL CHECK(price_at_time > 0),
+                FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE CASCADE
+            );
+            
+            -- Order cancellations table for tracking cancellations
+            CREATE TABLE IF NOT EXISTS order_cancellations (
+                cancellation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                cancelled_by TEXT NOT NULL,
+                cancellation_type TEXT NOT NULL CHECK(cancellation_type IN ('customer', 'staff')),
+                cancellation_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reason TEXT,
+                FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE CASCADE
+            );
+        ''')
+        
+        # Create custom constraints and triggers
+        self.create_constraints_and_triggers(cursor)
+        
+        # Insert sample data into a fresh database only
+        cursor.execute('SELECT COUNT(*) FROM ingredients')
+        if cursor.fetchone()[0] == 0:
+            self.insert_sample_data(cursor)
+        
+        # Create views
+        self.create_views(cursor)
+    
+    def create_constraints_and_triggers(self, cursor):
+        """Create custom constraints and triggers for business rules"""
+        
+        # Trigger 1: Ensure vegetarian pizzas don't contain meat
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS check_vegetarian_pizza_insert
+            BEFORE INSERT ON pizza_ingredients
+            FOR EACH ROW
+            WHEN (
+                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
+            ) = 1
+            BEGIN
+                SELECT CASE
+                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
+                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
+                END;
+            END;
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS check_vegetarian_pizza_update
+            BEFORE UPDATE ON pizza_ingredients
+            FOR EACH ROW
+            WHEN (
+                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
+            ) = 1
+            BEGIN
+                SELECT CASE
+                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
+                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
+                END;
+            END;
+        ''')
+        
+        # Trigger 2: Validate customer age (at least 13 years old)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS validate_customer_age_insert
+            BEFORE INSERT ON customers
+            FOR EACH ROW
+            BEGIN
+                SELECT CASE
+                    WHEN date(NEW.birth_date) > date('now', '-13 years')
+                    THEN RAISE(ABORT, 'Customer must be at least 13 years old')
+                END;
+            END;
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS validate_customer_age_update
+            BEFORE UPDATE ON customers
+            FOR EACH ROW
+            BEGIN
+                SELECT CASE
+                    WHEN date(NEW.birth_date) > date('now', '-13 years')
+                    THEN RAISE(ABORT, 'Customer must be at least 13 years old')
+                END;
+            END;
+        ''')
+        
+        # Trigger 3: Prevent discount code reuse
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS prevent_discount_reuse
+            BEFORE UPDATE ON discount_codes
+            FOR EACH ROW
+            WHEN NEW.is_used = 1 AND OLD.is_used = 0
+            BEGIN
+                -- Check if this code is already used by someone else
+                SELECT CASE
+                    WHEN EXISTS (
+                        SELECT 1 FROM discount_codes 
+                        WHERE code = NEW.code AND is_used = 1 AND code_id != NEW.code_id
+                    )
+                    THEN RAISE(ABORT, 'Discount code has already been used')
+                END;
+            END;
+        ''')
+        
+        # Trigger 4: Ensure at least one pizza per order - FIXED: Use CASE instead of IF
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS validate_order_has_pizza
+            AFTER INSERT ON order_items
+            FOR EACH ROW
+            WHEN (SELECT COUNT(*) FROM order_items WHERE order_id = NEW.order_id AND item_type = 'pizza') = 0
+            BEGIN
+                -- Delete the invalid order
+                DELETE FROM orders WHERE order_id = NEW.order_id;
+                SELECT RAISE(ABORT, 'Order must contain at least one pizza');
+            END;
+        ''')
+        
+        # Trigger 5: Update pizza vegetarian status automatically
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS update_pizza_vegetarian_status_insert
+            AFTER INSERT ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                UPDATE pizzas 
+                SET is_vegetarian = (
+                    SELECT CASE 
+                        WHEN COUNT(*) = 0 THEN 0
+                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
+                        ELSE 0
+                    END
+                    FROM pizza_ingredients pi
+                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+                    WHERE pi.pizza_id = NEW.pizza_id
+                )
+                WHERE pizza_id = NEW.pizza_id;
+            END;
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS update_pizza_vegetarian_status_delete
+            AFTER DELETE ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                UPDATE pizzas 
+                SET is_vegetarian = (
+                    SELECT CASE 
+                        WHEN COUNT(*) = 0 THEN 0
+                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
+                        ELSE 0
+                    END
+                    FROM pizza_ingredients pi
+                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+                    WHERE pi.pizza_id = OLD.pizza_id
+                )
+                WHERE pizza_id = OLD.pizza_id;
+            END;
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS update_pizza_vegetarian_status_update
+            AFTER UPDATE ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                UPDATE pizzas 
+                SET is_vegetarian = (
+                    SELECT CASE 
+                        WHEN COUNT(*) = 0 THEN 0
+                        WHEN SUM(CASE WHEN i.is_vegetarian = 0 THEN 1 ELSE 0 END) = 0 THEN 1
+                        ELSE 0
+                    END
+                    FROM pizza_ingredients pi
+                    JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+                    WHERE pi.pizza_id = NEW.pizza_id
+                )
+                WHERE pizza_id = NEW.pizza_id;
+            END;
+        ''')
+        
+        # Trigger 6: Prevent order cancellation after 5 minutes
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS prevent_late_cancellation
+            BEFORE UPDATE OF status ON orders
+            FOR EACH ROW
+            WHEN NEW.status = 'Cancelled' AND OLD.status != 'Cancelled'
+            BEGIN
+                SELECT CASE
+                    WHEN datetime('now') > datetime(OLD.order_date, '+5 minutes')
+                    THEN RAISE(ABORT, 'Orders can only be cancelled within 5 minutes of placement')
+                END;
+            END;
+        ''')
+        
+        # Trigger 7: Ensure unique discount codes (enhanced)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS ensure_unique_discount_codes
+            BEFORE INSERT ON discount_codes
+            FOR EACH ROW
+            BEGIN
+                SELECT CASE
+                    WHEN EXISTS (SELECT 1 FROM discount_codes WHERE code = NEW.code)
+                    THEN RAISE(ABORT, 'Discount code must be unique')
+                END;
+            END;
+        ''')
+        
+        # Trigger 8: Validate order total amount
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS validate_order_total
+            BEFORE INSERT ON orders
+            FOR EACH ROW
+            BEGIN
+                SELECT CASE
+                    WHEN NEW.total_amount < 0 
+                    THEN RAISE(ABORT, 'Order total cannot be negative')
+                    WHEN NEW.total_amount > 1000
+                    THEN RAISE(ABORT, 'Order total cannot exceed 1000')
+                END;
+            END;
+        ''')
+        
+        # Create indexes for performance
+        run_script(cursor, '''
+            CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON orders(customer_id, order_date);
+            CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status, order_date);
+            CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+            CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
+            CREATE INDEX IF NOT EXISTS idx_pizza_ingredients_pizza_id ON pizza_ingredients(pizza_id);
+            CREATE INDEX IF NOT EXISTS idx_area_coverage_postal_code ON area_coverage(postal_code);
+            CREATE INDEX IF NOT EXISTS idx_order_cancellations_order_id ON order_cancellations(order_id);
+            CREATE INDEX IF NOT EXISTS idx_orders_delivery_person ON orders(delivery_person_id);
+            CREATE INDEX IF NOT EXISTS idx_customers_postal_code ON customers(postal_code);
+        ''')
+
+    def insert_sample_data(self, cursor):    
+        # Disable the vegetarian check triggers temporarily
+        cursor.execute('DROP TRIGGER IF EXISTS check_vegetarian_pizza_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS check_vegetarian_pizza_update')
+        
+        local_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        # Insert ingredients with valid costs
+        ingredients = [
+            ('Tomato Sauce', 0.5, 1, 1),
+            ('Mozzarella Cheese', 1.2, 1, 0),
+            ('Pepperoni', 1.5, 0, 0),
+            ('Mushrooms', 0.8, 1, 1),
+            ('Green Peppers', 0.7, 1, 1),
+            ('Onions', 0.6, 1, 1),
+            ('Black Olives', 0.9, 1, 1),
+            ('Sausage', 1.4, 0, 0),
+            ('Bacon', 1.6, 0, 0),
+            ('Ham', 1.3, 0, 0),
+            ('Pineapple', 0.9, 1, 1),
+            ('Fresh Basil', 0.5, 1, 1),
+            ('Vegan Cheese', 1.8, 1, 1)
+        ]
+        cursor.executemany(
+            'INSERT INTO ingredients (name, cost, is_vegetarian, is_vegan) VALUES (?, ?, ?, ?)',
+            ingredients
+        )
+
+        # Insert pizzas (set all as non-vegetarian initially)
+        pizzas = [
+            ('Margherita', 'Classic tomato and cheese', 'Medium', 'Classic', 0),
+            ('Pepperoni', 'Pepperoni and cheese', 'Medium', 'Classic', 0),
+            ('Vegetarian', 'Mixed vegetables', 'Medium', 'Classic', 0),
+            ('Hawaiian', 'Ham and pineapple', 'Medium', 'Classic', 0),
+            ('Meat Lovers', 'All meat toppings', 'Large', 'Premium', 0),
+            ('Vegan Special', 'Vegan cheese and vegetables', 'Medium', 'Specialty', 0),
+            ('BBQ Chicken', 'BBQ sauce with chicken', 'Large', 'Premium', 0),
+            ('Four Cheese', 'Four cheese blend', 'Medium', 'Classic', 0),
+            ('Mushroom Delight', 'Extra mushrooms', 'Medium', 'Classic', 0),
+            ('Spicy Italian', 'Spicy sausage and peppers', 'Medium', 'Specialty', 0)
+        ]
+        cursor.executemany(
+            'INSERT INTO pizzas (name, description, size, category, is_vegetarian) VALUES (?, ?, ?, ?, ?)',
+            pizzas
+        )
+
+        # Insert pizza ingredients - now all should work
+        pizza_ingredients = [
+            # Margherita
+            (1, 1), (1, 2), (1, 12),
+            # Pepperoni
+            (2, 1), (2, 2), (2, 3),
+            # Vegetarian
+            (3, 1), (3, 2), (3, 4), (3, 5), (3, 6), (3, 7),
+            # Hawaiian
+            (4, 1), (4, 2), (4, 10), (4, 11),
+            # Meat Lovers
+            (5, 1), (5, 2), (5, 3), (5, 8), (5, 9),
+            # Vegan Special
+            (6, 1), (6, 13), (6, 4), (6, 5), (6, 6),
+            # BBQ Chicken
+            (7, 1), (7, 2), (7, 8),
+            # Four Cheese
+            (8, 1), (8, 2), (8, 13),
+            # Mushroom Delight
+            (9, 1), (9, 2), (9, 4),
+            # Spicy Italian
+            (10, 1), (10, 2), (10, 8), (10, 5)
+        ]
+
+        cursor.executemany(
+            'INSERT INTO pizza_ingredients (pizza_id, ingredient_id) VALUES (?, ?)',
+            pizza_ingredients
+        )
+
+        # The rest of your insert methods remain the same...
+        # Insert drinks
+        drinks = [
+            ('Coca-Cola', 2.5, 'Medium'),
+            ('Sprite', 2.5, 'Medium'),
+            ('Water', 1.5, 'Medium'),
+            ('Orange Juice', 3.0, 'Medium'),
+            ('Beer', 4.5, 'Medium')
+        ]
+        cursor.executemany(
+            'INSERT INTO drinks (name, price, size) VALUES (?, ?, ?)',
+            drinks
+        )
+
+        # Insert desserts
+        desserts = [
+            ('Tiramisu', 4.5),
+            ('Chocolate Cake', 3.5),
+            ('Ice Cream', 3.0),
+            ('Cheesecake', 4.0)
+        ]
+        cursor.executemany(
+            'INSERT INTO desserts (name, price) VALUES (?, ?)',
+            desserts
+        )
+
+        # Insert delivery persons
+        delivery_persons = [
+            ('Jan de Vries', '+31 6 12345678', 1, None, 'City Center', 'Bike'),
+            ('Lisa Jansen', '+31 6 23456789', 1, None, 'Wyck', 'Scooter'),
+            ('Mohammed Ali', '+31 6 34567890', 1, None, 'Caberg', 'Car'),
+            ('Anna Schmidt', '+31 6 45678901', 1, None, 'Malberg', 'Bike'),
+            ('Tom Bakker', '+31 6 56789012', 1, None, 'Brusselsepoort', 'Scooter')
+        ]
+        cursor.executemany(
+            'INSERT INTO delivery_persons (name, phone, is_available, last_delivery_time, current_location, vehicle_type) VALUES (?, ?, ?, ?, ?, ?)',
+            delivery_persons
+        )
+
+        # Insert area coverage
+        area_coverage = [
+            (1, '6211', 'City Center - Markt', 15),
+            (1, '6212', 'City Center - Vrijthof', 15),
+            (1, '6213', 'City Center - Boschstraat', 18),
+            (2, '6221', 'Wyck - Station', 20),
+            (2, '6222', 'Wyck - Maasboulevard', 22),
+            (2, '6223', 'Wyck - Rechtstraat', 25),
+            (3, '6217', 'Caberg', 30),
+            (3, '6218', 'Daalhof', 28),
+            (3, '6219', 'Mariaberg', 35),
+            (4, '6215', 'Malberg', 25),
+            (4, '6216', 'Malpertuis', 28),
+            (4, '6224', 'Nazareth', 32),
+            (5, '6214', 'Brusselsepoort', 22),
+            (5, '6225', 'Amby', 35),
+            (5, '6226', 'Heugem', 30),
+            (5, '6227', 'Randwyck', 25),
+            (5, '6228', 'Heer', 40),
+            (5, '6229', 'Borgharen', 45)
+        ]
+        cursor.executemany(
+            'INSERT INTO area_coverage (driver_id, postal_code, area_name, delivery_time_minutes) VALUES (?, ?, ?, ?)',
+            area_coverage
+        )
+
+        # Insert discount codes with future expiry dates
+        future_date = (datetime.datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
+        discount_codes = [
+            ('WELCOME10', 10, 0, None, future_date),
+            ('PIZZALOVER', 15, 0, None, future_date),
+            ('SAVE20', 20, 0, None, future_date),
+            ('MAASTRICHT25', 25, 0, None, future_date)
+        ]
+        cursor.executemany(
+            'INSERT INTO discount_codes (code, discount_percent, is_used, used_by_customer_id, expiry_date) VALUES (?, ?, ?, ?, ?)',
+            discount_codes
+        )
+
+        # Insert sample customers with valid birth dates (at least 13 years old)
+        customers = [
+            ('Emma van Dijk', 'emma@email.com', '+31 6 11111111', 'Vrijthof 25', '6211', '1990-05-15', 'Female', 5),
+            ('Lucas Jansen', 'lucas@email.com', '+31 6 22222222', 'Stationstraat 12', '6221', '1985-08-22', 'Male', 12),
+            ('Sophie de Wit', 'sophie@email.com', '+31 6 33333333', 'Cabergerweg 8', '6217', '1995-02-10', 'Female', 8),
+            ('Thomas Maas', 'thomas@email.com', '+31 6 44444444', 'Malbergweg 15', '6215', '1988-11-30', 'Male', 3),
+            ('Isabelle Horn', 'isabelle@email.com', '+31 6 55555555', 'Brusselsepoort 42', '6214', '1992-07-18', 'Female', 7)
+        ]
+        cursor.executemany(
+            'INSERT INTO customers (name, email, phone, address, postal_code, birth_date, gender, total_pizzas_ordered) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            customers
+        )
+
+        # Re-create the vegetarian check triggers after sample data is inserted
+        cursor.execute('''
+            CREATE TRIGGER check_vegetarian_pizza_insert
+            BEFORE INSERT ON pizza_ingredients
+            FOR EACH ROW
+            WHEN (
+                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
+            ) = 1
+            BEGIN
+                SELECT CASE
+                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
+                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
+                END;
+            END;
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER check_vegetarian_pizza_update
+            BEFORE UPDATE ON pizza_ingredients
+            FOR EACH ROW
+            WHEN (
+                SELECT is_vegetarian FROM pizzas WHERE pizza_id = NEW.pizza_id
+            ) = 1
+            BEGIN
+                SELECT CASE
+                    WHEN (SELECT is_vegetarian FROM ingredients WHERE ingredient_id = NEW.ingredient_id) = 0
+                    THEN RAISE(ABORT, 'Vegetarian pizza cannot contain non-vegetarian ingredients')
+                END;
+            END;
+        ''')
+
+        
+    
+    def create_views(self, cursor):
+        # View for pizza prices with dynamic calculation
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS pizza_prices AS
+            SELECT 
+                p.pizza_id,
+                p.name,
+                p.size,
+                p.category,
+                SUM(i.cost) as base_cost,
+                ROUND((SUM(i.cost) * 1.4) * 1.09, 2) as final_price,
+                p.is_vegetarian,
+                CASE 
+                    WHEN SUM(CASE WHEN i.is_vegan = 0 THEN 1 ELSE 0 END) = 0 THEN 1 
+                    ELSE 0 
+                END as is_vegan
+            FROM pizzas p
+            JOIN pizza_ingredients pi ON p.pizza_id = pi.pizza_id
+            JOIN ingredients i ON pi.ingredient_id = i.ingredient_id
+            GROUP BY p.pizza_id
+        ''')
+        
+        # View for menu items
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS menu_view AS
+            SELECT 
+                'pizza' as item_type,
+                pizza_id as item_id,
+                name,
+                final_price as price,
+                size,
+                is_vegetarian,
+                is_vegan
+            FROM pizza_prices
+            UNION ALL
+            SELECT 
+                'drink' as item_type,
+                drink_id as item_id,
+                name,
+                price,
+                size,
+                0 as is_vegetarian,
+                0 as is_vegan
+            FROM drinks
+            UNION ALL
+            SELECT 
+                'dessert' as item_type,
+                dessert_id as item_id,
+                name,
+                price,
+                '' as size,
+                0 as is_vegetarian,
+                0 as is_vegan
+            FROM desserts
+        ''')
+        
+        # View for delivery assignments
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS delivery_assignments AS
+            SELECT 
+                o.order_id,
+                o.customer_id,
+                c.name as customer_name,
+                c.address,
+                c.postal_code,
+                o.total_amount,
+                o.status,
+                o.delivery_person_id,
+                dp.name as delivery_person_name,
+                dp.phone as delivery_phone,
+                dp.vehicle_type,
+                ac.area_name,
+                ac.delivery_time_minutes,
+                o.estimated_delivery_time,
+                o.actual_delivery_time,
+                o.order_date
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.customer_id
+            LEFT JOIN delivery_persons dp ON o.delivery_person_id = dp.driver_id
+            LEFT JOIN area_coverage ac ON (dp.driver_id = ac.driver_id AND c.postal_code = ac.postal_code)
+        ''')
+
+        # View for order cancellation eligibility
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS order_cancellation_eligibility AS
+            SELECT 
+                order_id,
+                customer_id,
+                order_date,
+                status,
+                CASE 
+                    WHEN datetime('now') <= datetime(order_date, '+5 minutes') 
+                    THEN 1 
+                    ELSE 0 
+                END as can_cancel,
+                datetime(order_date, '+5 minutes') as cancellation_deadline
+            FROM orders
+            WHERE status IN ('Pending', 'Preparing')
+        ''')
+
+        # View for real-time inventory tracking
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS ingredient_usage AS
+            SELECT 
+                i.ingredient_id,
+                i.name,
+                i.cost,
+                COALESCE(SUM(pi.quantity * oi.quantity), 0) as total_used,
+                i.cost * COALESCE(SUM(pi.quantity * oi.quantity), 0) as total_cost
+            FROM ingredients i
+            LEFT JOIN pizza_ingredients pi ON i.ingredient_id = pi.ingredient_id
+            LEFT JOIN order_items oi ON pi.pizza_id = oi.item_id AND oi.item_type = 'pizza'
+            LEFT JOIN orders o ON oi.order_id = o.order_id
+            WHERE o.order_date >= date('now', '-7 days')
+            GROUP BY i.ingredient_id, i.name, i.cost
+        ''')
+
+        # View for customer loyalty tiers
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS customer_loyalty_tiers AS
+            SELECT 
+                customer_id,
+                name,
+                total_pizzas_ordered,
+                CASE 
+                    WHEN total_pizzas_ordered >= 20 THEN 'Gold'
+                    WHEN total_pizzas_ordered >= 10 THEN 'Silver'
+                    WHEN total_pizzas_ordered >= 5 THEN 'Bronze'
+                    ELSE 'New'
+                END as loyalty_tier,
+                CASE 
+                    WHEN total_pizzas_ordered >= 20 THEN 15
+                    WHEN total_pizzas_ordered >= 10 THEN 10
+                    WHEN total_pizzas_ordered >= 5 THEN 5
+                    ELSE 0
+                END as loyalty_discount_percent
+            FROM customers
+            WHERE total_pizzas_ordered > 0
+        ''')
+
+    def migrate_pizza_price_cache(self, cursor):
+        """Migration 2: store pizza prices instead of aggregating them on every read.
+
+        pizza_price_cache holds one row per pizza that has ingredients, kept
+        current by triggers on pizza_ingredients and on ingredient cost/vegan
+        changes. pizza_prices becomes a primary-key join onto it, so menu_view
+        and existing callers keep working unchanged.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pizza_price_cache (
+                pizza_id INTEGER PRIMARY KEY,
+                base_cost DECIMAL(10,2) NOT NULL,
+                final_price DECIMAL(10,2) NOT NULL,
+                is_vegan BOOLEAN NOT NULL CHECK(is_vegan IN (0, 1)),
+                FOREIGN KEY (pizza_id) REFERENCES pizzas(pizza_id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pizza_price_cache_final_price ON pizza_price_cache(final_price)')
+
+        refresh = PIZZA_PRICE_REFRESH
+        # Pizzas left without ingredients drop out, as they did from the view
+        prune = '''
+                DELETE FROM pizza_price_cache 
+                WHERE pizza_id = OLD.pizza_id
+                AND NOT EXISTS (SELECT 1 FROM pizza_ingredients WHERE pizza_id = OLD.pizza_id);
+        '''
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS pizza_price_cache_recipe_insert
+            AFTER INSERT ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                {refresh.format(where='pi.pizza_id = NEW.pizza_id')}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS pizza_price_cache_recipe_delete
+            AFTER DELETE ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                {refresh.format(where='pi.pizza_id = OLD.pizza_id')}
+                {prune}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS pizza_price_cache_recipe_update
+            AFTER UPDATE OF pizza_id, ingredient_id ON pizza_ingredients
+            FOR EACH ROW
+            BEGIN
+                {refresh.format(where='pi.pizza_id IN (OLD.pizza_id, NEW.pizza_id)')}
+                {prune}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS pizza_price_cache_ingredient_update
+            AFTER UPDATE OF cost, is_vegan ON ingredients
+            FOR EACH ROW
+            BEGIN
+                {refresh.format(where='pi.pizza_id IN (SELECT pizza_id FROM pizza_ingredients WHERE ingredient_id = NEW.ingredient_id)')}
+            END;
+        ''')
+
+        # Backfill, then point pizza_prices at the cache
+        cursor.execute(refresh.format(where='1'))
+
+        cursor.execute('DROP VIEW IF EXISTS pizza_prices')
+        cursor.execute('''
+            CREATE VIEW pizza_prices AS
+            SELECT 
+                p.pizza_id,
+                p.name,
+                p.size,
+                p.category,
+                c.base_cost,
+                c.final_price,
+                p.is_vegetarian,
+                c.is_vegan
+            FROM pizza_price_cache c
+            JOIN pizzas p ON p.pizza_id = c.pizza_id
+        ''')
+
+    def migrate_catalog_version(self, cursor):
+        """Migration 3: a single-row counter that changes whenever the menu can change.
+
+        Readers compare it with the version their cached menu was built from,
+        which costs one primary-key read instead of re-running menu_view.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_version (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)')
+
+        for table in CATALOG_TABLES:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS bump_catalog_version_{table}_{event.lower()}
+                    AFTER {event} ON {table}
+                    FOR EACH ROW
+                    BEGIN
+                        UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                    END;
+                ''')
+
+    def migrate_daily_sales_rollup(self, cursor):
+        """Migration 4: per-day sales totals, so period reports never scan orders.
+
+        daily_sales_rollup has one row per day x item x postal code x gender
+        x age group; rows with item_type 'order' (item_id 0) hold the order
+        count and order revenue, the others the quantity and line revenue of
+        one menu item. Cancelled orders are left out. Customer attributes are
+        the current ones and the age group is the customer's age in the year
+        of the order. Triggers on orders, order_items and customers keep the
+        totals current: changes add or subtract the affected contributions.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+                day DATE NOT NULL,
+                item_type TEXT NOT NULL CHECK(item_type IN ('order', 'pizza', 'drink', 'dessert')),
+                item_id INTEGER NOT NULL,
+                postal_code TEXT NOT NULL,
+                gender TEXT NOT NULL,
+                age_group TEXT NOT NULL,
+                order_count INTEGER NOT NULL DEFAULT 0,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                revenue DECIMAL(10,2) NOT NULL DEFAULT 0,
+                PRIMARY KEY (item_type, day, item_id, postal_code, gender, age_group)
+            ) WITHOUT ROWID
+        ''')
+
+        # Contributions of order {o} and its line {oi} (OLD, NEW or table
+        # aliases), placed by customer {c}, added with sign {s}; {source}
+        # supplies the FROM/WHERE part
+        age_group = ROLLUP_AGE_GROUP
+        upsert = '''
+                INSERT INTO daily_sales_rollup 
+                    (day, item_type, item_id, postal_code, gender, age_group, order_count, quantity, revenue)
+                SELECT {columns}
+                {source}
+                ON CONFLICT (item_type, day, item_id, postal_code, gender, age_group) DO UPDATE SET
+                    order_count = order_count + excluded.order_count,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue;
+        '''
+
+        def order_row(o, c, s, source):
+            columns = (f"date({o}.order_date), 'order', 0, {c}.postal_code, {c}.gender, "
+                       f"{age_group.format(o=o, c=c)}, {s}, 0, {s} * {o}.total_amount")
+            return upsert.format(columns=columns, source=source)
+
+        def item_row(o, oi, c, s, source):
+            columns = (f"date({o}.order_date), {oi}.item_type, {oi}.item_id, {c}.postal_code, {c}.gender, "
+                       f"{age_group.format(o=o, c=c)}, 0, {s} * {oi}.quantity, {s} * {oi}.quantity * {oi}.price_at_time")
+            return upsert.format(columns=columns, source=source)
+
+        def whole_order(o, s):
+            """The order row {o} and all of its items"""
+            customer = f"FROM customers c WHERE c.customer_id = {o}.customer_id AND {o}.status != 'Cancelled'"
+            items = (f"FROM order_items oi JOIN customers c ON c.customer_id = {o}.customer_id "
+                     f"WHERE oi.order_id = {o}.order_id AND {o}.status != 'Cancelled'")
+            return order_row(o, 'c', s, customer) + item_row(o, 'oi', 'c', s, items)
+
+        def one_item(oi, s):
+            """The order_items row {oi}, while its order exists and is not cancelled"""
+            source = (f"FROM orders o JOIN customers c ON c.customer_id = o.customer_id "
+                      f"WHERE o.order_id = {oi}.order_id AND o.status != 'Cancelled'")
+            return item_row('o', oi, 'c', s, source)
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_order_insert
+            AFTER INSERT ON orders
+            FOR EACH ROW
+            BEGIN
+                {whole_order('NEW', 1)}
+            END;
+        ''')
+
+        # Status changes only matter when they enter or leave 'Cancelled'
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_order_update
+            AFTER UPDATE OF status, total_amount, order_date, customer_id ON orders
+            FOR EACH ROW
+            WHEN (OLD.status = 'Cancelled') != (NEW.status = 'Cancelled')
+                OR OLD.total_amount IS NOT NEW.total_amount
+                OR OLD.order_date IS NOT NEW.order_date
+                OR OLD.customer_id IS NOT NEW.customer_id
+            BEGIN
+                {whole_order('OLD', -1)}
+                {whole_order('NEW', 1)}
+            END;
+        ''')
+
+        # BEFORE, so the items are still there; the cascade that deletes them
+        # afterwards no longer finds the order and subtracts nothing twice
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_order_delete
+            BEFORE DELETE ON orders
+            FOR EACH ROW
+            BEGIN
+                {whole_order('OLD', -1)}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_item_insert
+            AFTER INSERT ON order_items
+            FOR EACH ROW
+            BEGIN
+                {one_item('NEW', 1)}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_item_delete
+            AFTER DELETE ON order_items
+            FOR EACH ROW
+            BEGIN
+                {one_item('OLD', -1)}
+            END;
+        ''')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_item_update
+            AFTER UPDATE ON order_items
+            FOR EACH ROW
+            BEGIN
+                {one_item('OLD', -1)}
+                {one_item('NEW', 1)}
+            END;
+        ''')
+
+        # Move a customer's history to their new postal code / gender / age group
+        customer_orders = "FROM orders o WHERE o.customer_id = NEW.customer_id AND o.status != 'Cancelled'"
+        customer_items = ("FROM order_items oi JOIN orders o ON o.order_id = oi.order_id "
+                          "WHERE o.customer_id = NEW.customer_id AND o.status != 'Cancelled'")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_sales_rollup_customer_update
+            AFTER UPDATE OF postal_code, gender, birth_date ON customers
+            FOR EACH ROW
+            WHEN OLD.postal_code IS NOT NEW.postal_code
+                OR OLD.gender IS NOT NEW.gender
+                OR OLD.birth_date IS NOT NEW.birth_date
+            BEGIN
+                {order_row('o', 'OLD', -1, customer_orders)}
+                {item_row('o', 'oi', 'OLD', -1, customer_items)}
+                {order_row('o', 'NEW', 1, customer_orders)}
+                {item_row('o', 'oi', 'NEW', 1, customer_items)}
+            END;
+        ''')
+
+        # Backfill from the existing history
+        cursor.execute('DELETE FROM daily_sales_rollup')
+        add_orders_to_daily_rollup(cursor)
+
+    def migrate_birthday_discounts(self, cursor):
+        """Migration 5: record birthday discounts instead of guessing them.
+
+        orders.birthday_discount_applied is set by place_order and counted
+        through a partial index. customers.birth_md is the 'MM-DD' part of
+        birth_date as an indexed virtual generated column, so birthday
+        lookups compare a stored key instead of formatting every birth_date.
+        Existing orders are flagged when a discount was given on the
+        customer's own birthday.
+        """
+        cursor.execute('PRAGMA table_xinfo(orders)')
+        if 'birthday_discount_applied' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('''
+                ALTER TABLE orders ADD COLUMN birthday_discount_applied INTEGER NOT NULL DEFAULT 0
+                    CHECK(birthday_discount_applied IN (0, 1))
+            ''')
+        cursor.execute('PRAGMA table_xinfo(customers)')
+        if 'birth_md' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('''
+                ALTER TABLE customers ADD COLUMN birth_md TEXT
+                    GENERATED ALWAYS AS (substr(birth_date, 6, 5)) VIRTUAL
+            ''')
+
+        run_script(cursor, '''
+            CREATE INDEX IF NOT EXISTS idx_customers_birth_md ON customers(birth_md);
+            CREATE INDEX IF NOT EXISTS idx_orders_birthday_discount
+                ON orders(order_date) WHERE birthday_discount_applied = 1;
+        ''')
+
+        cursor.execute('''
+            UPDATE orders SET birthday_discount_applied = 1
+            WHERE discount_applied > 0
+            AND substr(order_date, 6, 5) = (
+                SELECT birth_md FROM customers WHERE customer_id = orders.customer_id
+            )
+        ''')
+
+    def migrate_epoch_timestamps(self, cursor):
+        """Migration 6: integer epoch copies of the order timestamps.
+
+        The text columns may hold 'YYYY-MM-DD HH:MM:SS' or isoformat() values
+        with a 'T', which do not compare as ranges; the *_ts columns hold
+        Unix seconds parsed from them (NULL when unparseable) and are what
+        range filters, ordering and durations use. Triggers recompute them
+        whenever a timestamp is inserted or changed, unless the writer
+        already supplied the matching value. The covering indexes replace
+        the (status, order_date) and (customer_id, order_date) ones.
+        """
+        cursor.execute('PRAGMA table_xinfo(orders)')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column in EPOCH_COLUMNS.values():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE orders ADD COLUMN {column} INTEGER')
+
+        epoch = "CAST(strftime('%s', {row}.{text}) AS INTEGER)"
+        stale = ' OR '.join(
+            f'NEW.{ts} IS NOT {epoch.format(row="NEW", text=text)}' for text, ts in EPOCH_COLUMNS.items()
+        )
+        assignments = ', '.join(
+            f'{ts} = {epoch.format(row="orders", text=text)}' for text, ts in EPOCH_COLUMNS.items()
+        )
+
+        cursor.execute(f'UPDATE orders SET {assignments}')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS orders_epoch_insert
+            AFTER INSERT ON orders
+            FOR EACH ROW
+            WHEN {stale}
+            BEGIN
+                UPDATE orders SET {assignments} WHERE order_id = NEW.order_id;
+            END;
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS orders_epoch_update
+            AFTER UPDATE OF {', '.join(list(EPOCH_COLUMNS) + list(EPOCH_COLUMNS.values()))} ON orders
+            FOR EACH ROW
+            WHEN {stale}
+            BEGIN
+                UPDATE orders SET {assignments} WHERE order_id = NEW.order_id;
+            END;
+        ''')
+
+        run_script(cursor, '''
+            DROP INDEX IF EXISTS idx_orders_status_date;
+            DROP INDEX IF EXISTS idx_orders_customer_date;
+            CREATE INDEX IF NOT EXISTS idx_orders_status_ts
+                ON orders(status, order_ts, customer_id, total_amount);
+            CREATE INDEX IF NOT EXISTS idx_orders_customer_ts
+                ON orders(customer_id, order_ts, total_amount);
+        ''')
+
+    def migrate_deferred_pizza_validation(self, cursor):
+        """Migration 7: drop the per-row validate_order_has_pizza trigger.
+
+        It counted the order's pizza lines after every order_items insert,
+        O(k^2) work for a k-line order, and rejected valid carts whose first
+        line was a drink or dessert. publish_order_items() checks each
+        order once, after all of its lines are staged.
+        """
+        cursor.execute('DROP TRIGGER IF EXISTS validate_order_has_pizza')
+
+    def migrate_catalog_items(self, cursor):
+        """Migration 8: one catalog_items row per pizza, drink and dessert.
+
+        order_items points at all three through (item_type, item_id), which
+        no foreign key can express, so item names were looked up with a
+        CASE of correlated subqueries. catalog_items gives the pair one
+        primary key to join on and carries the name and current price;
+        triggers on the item tables and pizza_price_cache keep it in step.
+        The covering index on order_items answers per-item totals without
+        touching the table.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_items (
+                item_type TEXT NOT NULL CHECK(item_type IN ('pizza', 'drink', 'dessert')),
+                item_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                price DECIMAL(10,2),
+                PRIMARY KEY (item_type, item_id)
+            ) WITHOUT ROWID
+        ''')
+
+        for item_type, (table, key, name, price) in CATALOG_ITEM_SOURCES.items():
+            # Only changes to what catalog_items copies; pizzas.is_vegetarian
+            # is rewritten on every recipe change
+            columns = [key, name] + ([price] if price.isidentifier() else [])
+            new_price = f'NEW.{price}' if price.isidentifier() else price.format(row='NEW')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS catalog_items_{table}_insert
+                AFTER INSERT ON {table}
+                FOR EACH ROW
+                BEGIN
+                    INSERT OR REPLACE INTO catalog_items (item_type, item_id, name, price)
+                    VALUES ('{item_type}', NEW.{key}, NEW.{name}, {new_price});
+                END;
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS catalog_items_{table}_update
+                AFTER UPDATE OF {', '.join(columns)} ON {table}
+                FOR EACH ROW
+                BEGIN
+                    DELETE FROM catalog_items WHERE item_type = '{item_type}' AND item_id = OLD.{key};
+                    INSERT OR REPLACE INTO catalog_items (item_type, item_id, name, price)
+                    VALUES ('{item_type}', NEW.{key}, NEW.{name}, {new_price});
+                END;
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS catalog_items_{table}_delete
+                AFTER DELETE ON {table}
+                FOR EACH ROW
+                BEGIN
+                    DELETE FROM catalog_items WHERE item_type = '{item_type}' AND item_id = OLD.{key};
+                END;
+            ''')
+
+        # Pizza prices change with their recipes, not with the pizzas row
+        for event, value in (('INSERT', 'NEW.final_price'), ('UPDATE', 'NEW.final_price'), ('DELETE', 'NULL')):
+            row = 'OLD' if event == 'DELETE' else 'NEW'
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS catalog_items_pizza_price_{event.lower()}
+                AFTER {event} ON pizza_price_cache
+                FOR EACH ROW
+                BEGIN
+                    UPDATE catalog_items SET price = {value}
+                    WHERE item_type = 'pizza' AND item_id = {row}.pizza_id;
+                END;
+            ''')
+
+        for item_type, (table, key, name, price) in CATALOG_ITEM_SOURCES.items():
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO catalog_items (item_type, item_id, name, price)
+                SELECT '{item_type}', {key}, {name}, {price.format(row=table)} FROM {table}
+            ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_order_items_item_covering
+            ON order_items(item_type, item_id, order_id, quantity, price_at_time)
+        ''')
+
+    def migrate_order_generation(self, cursor):
+        """Migration 9: a single-row counter of write transactions on orders and drivers.
+
+        Each process keeps orders and drivers in memory (driver index, live
+        sales counters, tracking cache, dashboard feed). Writers bump the
+        counter once per transaction (bump_order_generation); a generation
+        a process did not write itself tells it another process, such as
+        intake.py or datagen.py, changed the data behind its back.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_generation (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO order_generation (id, generation) VALUES (1, 0)')
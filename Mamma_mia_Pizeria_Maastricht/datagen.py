@@ -0,0 +1,256 @@
+"""Bulk synthetic orders for load tests and benchmark datasets.
+
+Rows are drawn in chunks from the live catalog (current prices), written
+with executemany and committed one chunk per transaction. Foreign keys and
+the validation triggers stay on; only the per-row triggers listed in
+SUSPENDED_TRIGGERS are swapped for set-based work inside each chunk.
+
+Usage:
+    python datagen.py [DB_PATH] [--orders N] [--customers N] [--days N] [--seed S] [--chunk N]
+"""
+import argparse
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional: draws fall back to the random module
+    np = None
+
+from database import Database, add_orders_to_daily_rollup, bump_order_generation, suspended_triggers
+
+POSTAL_CODES = ('6211', '6212', '6215', '6217', '6221')
+GENDERS = ('Male', 'Female', 'Other')
+FIRST_NAMES = ('Anna', 'Bram', 'Chloe', 'Daan', 'Emma', 'Finn', 'Julia', 'Lars', 'Lotte', 'Milan',
+               'Noor', 'Ruben', 'Sara', 'Sem', 'Tess', 'Thijs', 'Vera', 'Wout', 'Yara', 'Zoe')
+LAST_NAMES = ('Bakker', 'de Boer', 'Dekker', 'Janssen', 'de Jong', 'Meijer', 'Mulder', 'Peeters',
+              'Smeets', 'Smit', 'de Vries', 'Visser', 'Willems', 'van Dijk', 'van Leeuwen')
+STREETS = ('Vrijthof', 'Markt', 'Boschstraat', 'Wycker Brugstraat', 'Tongersestraat',
+           'Brusselsestraat', 'Stationsstraat', 'Rechtstraat')
+
+# Share of orders that also get a drink / a dessert line
+DRINK_SHARE = 0.7
+DESSERT_SHARE = 0.5
+
+# Per-row triggers replaced while a chunk is written: every generated order
+# has a total under the limit by construction (and a pizza line, so the
+# lines skip publish_order_items and go straight to order_items), the *_ts
+# columns are written alongside the text ones, the customer updates only
+# touch total_pizzas_ordered, and the chunk's rollup contributions are added
+# with one set-based statement per row kind
+SUSPENDED_TRIGGERS = (
+    'validate_order_total',
+    'orders_epoch_insert',
+    'validate_customer_age_update',
+    'daily_sales_rollup_order_insert',
+    'daily_sales_rollup_item_insert',
+)
+
+
+def load_catalog(cursor):
+    """{item type: (ids, prices)} of everything that can be ordered, at current prices"""
+    catalog = {}
+    for item_type, query in (('pizza', 'SELECT pizza_id, final_price FROM pizza_price_cache'),
+                             ('drink', 'SELECT drink_id, price FROM drinks'),
+                             ('dessert', 'SELECT dessert_id, price FROM desserts')):
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        catalog[item_type] = ([row[0] for row in rows], [float(row[1]) for row in rows])
+    return catalog
+
+
+class _Draws:
+    """Uniform draws as Python lists, from NumPy when it is installed"""
+
+    def __init__(self, seed):
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
+        self.rng = random.Random(seed)
+
+    def integers(self, low, high, n):
+        """n ints in [low, high)"""
+        if self.np_rng is not None:
+            return self.np_rng.integers(low, high, n).tolist()
+        randrange = self.rng.randrange
+        return [randrange(low, high) for _ in range(n)]
+
+    def chance(self, p, n):
+        """n booleans, each True with probability p"""
+        if self.np_rng is not None:
+            return (self.np_rng.random(n) < p).tolist()
+        rand = self.rng.random
+        return [rand() < p for _ in range(n)]
+
+
+def add_customers(cursor, count, draws, tag):
+    """Insert count customers; returns their ids. Emails embed tag and stay unique."""
+    first_id = cursor.execute('SELECT COALESCE(MAX(customer_id), 0) + 1 FROM customers').fetchone()[0]
+    now = time.time()
+    # Between 13 and 80 years old, so the age trigger accepts everyone
+    ages = draws.integers(13 * 366, 80 * 365, count)
+    first = draws.integers(0, len(FIRST_NAMES), count)
+    last = draws.integers(0, len(LAST_NAMES), count)
+    streets = draws.integers(0, len(STREETS), count)
+    houses = draws.integers(1, 200, count)
+    postal = draws.integers(0, len(POSTAL_CODES), count)
+    gender = draws.integers(0, len(GENDERS), count)
+    cursor.executemany('''
+        INSERT INTO customers (customer_id, name, email, phone, address, postal_code, birth_date, gender)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        (first_id + n,
+         f'{FIRST_NAMES[first[n]]} {LAST_NAMES[last[n]]}',
+         f'{tag}-{first_id + n}@example.com',
+         f'+31 6 {(first_id + n) % 10 ** 8:08d}',
+         f'{STREETS[streets[n]]} {houses[n]}, Maastricht',
+         POSTAL_CODES[postal[n]],
+         time.strftime('%Y-%m-%d', time.gmtime(now - ages[n] * 86400)),
+         GENDERS[gender[n]])
+        for n in range(count)
+    ))
+    return list(range(first_id, first_id + count))
+
+
+def generate_orders(conn, orders, customers=None, days=90, seed=None, chunk_size=50000, progress=None):
+    """Insert orders delivered over the last days days, with their items.
+
+    customers new customers are created first (default: one per ten
+    orders) and orders are spread over them and the existing ones. Each
+    order has one pizza line, a drink line for DRINK_SHARE and a dessert
+    line for DESSERT_SHARE of orders; the total is what the lines cost.
+    Every chunk of chunk_size orders is one transaction, and progress, when
+    given, is called with the number of orders written so far after each
+    commit. The same seed on the same starting database (and the same
+    NumPy availability) gives the same data.
+
+    Returns {'orders', 'items', 'customers', 'seconds'}.
+    """
+    started = time.perf_counter()
+    draws = _Draws(seed)
+    cursor = conn.cursor()
+    catalog = load_catalog(cursor)
+    for item_type in ('pizza', 'drink', 'dessert'):
+        if not catalog[item_type][0]:
+            raise ValueError(f"Cannot generate orders without any {item_type} on the menu")
+    cursor.execute('SELECT driver_id FROM delivery_persons')
+    drivers = [row[0] for row in cursor.fetchall()]
+    if not drivers:
+        raise ValueError("Cannot generate delivered orders without delivery persons")
+
+    if customers is None:
+        customers = max(1, orders // 10)
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        new_customers = add_customers(cursor, customers, draws, f'loadtest{seed if seed is not None else ""}')
+        cursor.execute('SELECT customer_id FROM customers')
+        customer_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        if orders and not customer_ids:
+            raise ValueError("Cannot generate orders without any customers")
+    except Exception:
+        conn.rollback()
+        raise
+
+    pizza_ids, pizza_prices = catalog['pizza']
+    drink_ids, drink_prices = catalog['drink']
+    dessert_ids, dessert_prices = catalog['dessert']
+    now = int(time.time())
+    items = 0
+    written = 0
+    while written < orders:
+        n = min(chunk_size, orders - written)
+        customer = draws.integers(0, len(customer_ids), n)
+        # Chunks cover consecutive slices of the period and are sorted, so
+        # order ids grow with order time as they do in production
+        start = now - days * 86400 + (days * 86400 - 3600) * written // orders
+        end = now - days * 86400 + (days * 86400 - 3600) * (written + n) // orders
+        placed = sorted(draws.integers(start, max(end, start + 1), n))
+        minutes = draws.integers(15, 61, n)
+        driver = draws.integers(0, len(drivers), n)
+        pizza = draws.integers(0, len(pizza_ids), n)
+        pizza_qty = draws.integers(1, 4, n)
+        has_drink = draws.chance(DRINK_SHARE, n)
+        drink = draws.integers(0, len(drink_ids), n)
+        drink_qty = draws.integers(1, 3, n)
+        has_dessert = draws.chance(DESSERT_SHARE, n)
+        dessert = draws.integers(0, len(dessert_ids), n)
+
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            first_order = cursor.execute('SELECT COALESCE(MAX(order_id), 0) + 1 FROM orders').fetchone()[0]
+            order_rows = []
+            pizza_rows = []
+            other_rows = []
+            pizzas_per_customer = {}
+            for i in range(n):
+                order_id = first_order + i
+                total = pizza_prices[pizza[i]] * pizza_qty[i]
+                pizza_rows.append((order_id, 'pizza', pizza_ids[pizza[i]], pizza_qty[i], pizza_prices[pizza[i]]))
+                if has_drink[i]:
+                    total += drink_prices[drink[i]] * drink_qty[i]
+                    other_rows.append((order_id, 'drink', drink_ids[drink[i]], drink_qty[i], drink_prices[drink[i]]))
+                if has_dessert[i]:
+                    total += dessert_prices[dessert[i]]
+                    other_rows.append((order_id, 'dessert', dessert_ids[dessert[i]], 1, dessert_prices[dessert[i]]))
+                delivered = placed[i] + minutes[i] * 60
+                customer_id = customer_ids[customer[i]]
+                order_rows.append((order_id, customer_id, placed[i], placed[i], round(total, 2),
+                                   drivers[driver[i]], delivered, delivered))
+                pizzas_per_customer[customer_id] = pizzas_per_customer.get(customer_id, 0) + pizza_qty[i]
+
+            with suspended_triggers(cursor, SUSPENDED_TRIGGERS):
+                cursor.executemany('''
+                    INSERT INTO orders (order_id, customer_id, order_date, order_ts, total_amount, status,
+                                        delivery_person_id, actual_delivery_time, actual_delivery_ts)
+                    VALUES (?, ?, datetime(?, 'unixepoch'), ?, ?, 'Delivered', ?, datetime(?, 'unixepoch'), ?)
+                ''', order_rows)
+                cursor.executemany('''
+                    INSERT INTO order_items (order_id, item_type, item_id, quantity, price_at_time)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', pizza_rows + other_rows)
+                add_orders_to_daily_rollup(cursor, 'o.order_id BETWEEN ? AND ?', (first_order, first_order + n - 1))
+                cursor.executemany(
+                    'UPDATE customers SET total_pizzas_ordered = total_pizzas_ordered + ? WHERE customer_id = ?',
+                    [(count, customer_id) for customer_id, count in pizzas_per_customer.items()]
+                )
+            bump_order_generation(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        written += n
+        items += len(pizza_rows) + len(other_rows)
+        if progress:
+            progress(written)
+
+    return {
+        'orders': written,
+        'items': items,
+        'customers': len(new_customers),
+        'seconds': time.perf_counter() - started
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', nargs='?', default='pizza_shop.db')
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--customers', type=int, default=None, help='new customers (default: orders / 10)')
+    parser.add_argument('--days', type=int, default=90, help='spread orders over this many past days')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--chunk', type=int, default=50000, help='orders per transaction')
+    args = parser.parse_args()
+
+    db = Database(args.db_path)
+    with db.connection() as conn:
+        result = generate_orders(
+            conn, args.orders, customers=args.customers, days=args.days, seed=args.seed,
+            chunk_size=args.chunk, progress=lambda done: print(f"{done} / {args.orders} orders", flush=True)
+        )
+    db.pool.close_all()
+    rate = result['orders'] / result['seconds'] * 60 if result['seconds'] else 0
+    print(f"Generated {result['orders']} orders, {result['items']} items and {result['customers']} customers "
+          f"in {result['seconds']:.1f} s ({rate:,.0f} orders/min)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+import calendar
+import heapq
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional: solve_assignment falls back to pure Python
+    np = None
+
+from eventbus import EventBus
+
+# Cost of a driver/order pair that cannot be used (driver does not cover the area)
+FORBIDDEN = 10 ** 9
+
+DRIVER_STATE_QUERY = '''
+    SELECT driver_id, name, phone, vehicle_type, is_available, last_delivery_time,
+           CAST(strftime('%s', last_delivery_time) AS INTEGER)
+    FROM delivery_persons
+'''
+
+
+class DriverAvailabilityIndex:
+    """In-process view of which drivers can take an order in each postal code.
+
+    Mirrors the rules of the original SQL lookup: a driver is eligible when
+    is_available = 1 or their last delivery ended at least cooldown_minutes
+    ago, and drivers whose cooldown has passed (or who never delivered) rank
+    ahead of the rest, then by delivery_time_minutes for the area.
+
+    Each postal code has a heap of (tier, minutes, driver_id, version)
+    entries. Changing a driver bumps its version and pushes fresh entries,
+    so outdated ones are skipped lazily; a timer heap re-ranks drivers when
+    their cooldown ends. Picking a driver is therefore O(log n) and never
+    runs SQL. The model pushes every availability change it writes, and the
+    whole index is reloaded from the database every reconcile_interval
+    seconds (or after invalidate()) to pick up changes made elsewhere.
+    Until then a driver may look free here after being taken elsewhere, so
+    claims are checked again in SQL and a lost claim re-reads that driver
+    with refresh_driver().
+    """
+
+    def __init__(self, cooldown_minutes=30, reconcile_interval=60.0, clock=time.time):
+        self.cooldown = cooldown_minutes * 60
+        self.reconcile_interval = reconcile_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._drivers = {}   # driver_id -> state dict, see load()
+        self._heaps = {}     # postal_code -> [(tier, minutes, driver_id, version)]
+        self._timers = []    # (cooldown ends at, driver_id, version)
+        self._loaded_at = None
+
+    def needs_reload(self):
+        return self._loaded_at is None or self.clock() - self._loaded_at >= self.reconcile_interval
+
+    def invalidate(self):
+        """Force a reload from the database before the next lookup"""
+        self._loaded_at = None
+
+    def load(self, conn):
+        """(Re)build the index from delivery_persons and area_coverage"""
+        cursor = conn.cursor()
+        cursor.execute(DRIVER_STATE_QUERY)
+        drivers = {row[0]: self._driver_state(row) for row in cursor.fetchall()}
+        cursor.execute('SELECT driver_id, postal_code, area_name, delivery_time_minutes FROM area_coverage')
+        for driver_id, postal_code, area_name, minutes in cursor.fetchall():
+            if driver_id in drivers:
+                drivers[driver_id]['areas'][postal_code] = (area_name, minutes)
+
+        with self._lock:
+            self._drivers = drivers
+            self._heaps = {}
+            self._timers = []
+            now = self.clock()
+            for driver_id in drivers:
+                self._reindex(driver_id, now)
+            self._loaded_at = now
+
+    def refresh_driver(self, conn, driver_id):
+        """Re-read one driver's availability, e.g. after a claim found the index stale"""
+        cursor = conn.cursor()
+        cursor.execute(f'{DRIVER_STATE_QUERY} WHERE driver_id = ?', (driver_id,))
+        row = cursor.fetchone()
+        with self._lock:
+            state = self._drivers.get(driver_id)
+            if row is None or state is None:
+                # Driver added or removed elsewhere: rebuild everything
+                self._loaded_at = None
+                return
+            fresh = self._driver_state(row)
+            for key in ('is_available', 'last_delivery_time', 'last_delivery_ts'):
+                state[key] = fresh[key]
+            self._reindex(driver_id, self.clock())
+
+    @staticmethod
+    def _driver_state(row):
+        return {
+            'name': row[1],
+            'phone': row[2],
+            'vehicle_type': row[3],
+            'is_available': bool(row[4]),
+            'last_delivery_time': row[5],
+            'last_delivery_ts': row[6],
+            'areas': {},
+            'version': 0
+        }
+
+    def best_driver(self, postal_code):
+        """The driver the SQL lookup would have listed first, or None"""
+        with self._lock:
+            now = self.clock()
+            self._fire_timers(now)
+            heap = self._heaps.get(postal_code)
+            while heap:
+                tier, minutes, driver_id, version = heap[0]
+                if self._drivers[driver_id]['version'] == version:
+                    return self._describe(driver_id, postal_code, tier)
+                heapq.heappop(heap)
+            return None
+
+    def available_drivers(self, postal_code):
+        """Every eligible driver for postal_code, best first"""
+        with self._lock:
+            now = self.clock()
+            ranked = []
+            for driver_id, state in self._drivers.items():
+                area = state['areas'].get(postal_code)
+                tier = self._tier(state, now)
+                if area is not None and tier is not None:
+                    ranked.append((tier, area[1], driver_id))
+            ranked.sort()
+            return [self._describe(driver_id, postal_code, tier) for tier, _, driver_id in ranked]
+
+    def eligible_drivers(self):
+        """{driver_id: (tier, {postal_code: delivery_time_minutes})} for every eligible driver"""
+        with self._lock:
+            now = self.clock()
+            self._fire_timers(now)
+            eligible = {}
+            for driver_id, state in self._drivers.items():
+                tier = self._tier(state, now)
+                if tier is not None and state['areas']:
+                    eligible[driver_id] = (tier, {code: minutes for code, (_, minutes) in state['areas'].items()})
+            return eligible
+
+    def update_driver(self, driver_id, is_available=None, delivered=False):
+        """Record a committed change: is_available flag and/or a delivery just completed"""
+        with self._lock:
+            state = self._drivers.get(driver_id)
+            if state is None:
+                self._loaded_at = None
+                return
+            now = self.clock()
+            if delivered:
+                state['last_delivery_ts'] = int(now)
+                state['last_delivery_time'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now))
+            if is_available is not None:
+                state['is_available'] = bool(is_available)
+            self._reindex(driver_id, now)
+
+    def reset_availability(self, driver_id):
+        """Available again unless the driver is still inside the cooldown window"""
+        with self._lock:
+            state = self._drivers.get(driver_id)
+            if state is None:
+                self._loaded_at = None
+                return
+            now = self.clock()
+            state['is_available'] = self._cooled_down(state, now)
+            self._reindex(driver_id, now)
+
+    def _cooled_down(self, state, now):
+        return state['last_delivery_ts'] is None or state['last_delivery_ts'] <= now - self.cooldown
+
+    def _tier(self, state, now):
+        """0 = actually available, 1 = flagged available but still cooling down, None = not eligible"""
+        if self._cooled_down(state, now):
+            if state['is_available'] or state['last_delivery_ts'] is not None:
+                return 0
+            return None
+        return 1 if state['is_available'] else None
+
+    def _reindex(self, driver_id, now):
+        state = self._drivers[driver_id]
+        state['version'] += 1
+        tier = self._tier(state, now)
+        if tier is not None:
+            for postal_code, (_, minutes) in state['areas'].items():
+                heapq.heappush(self._heaps.setdefault(postal_code, []), (tier, minutes, driver_id, state['version']))
+        if not self._cooled_down(state, now):
+            heapq.heappush(self._timers, (state['last_delivery_ts'] + self.cooldown, driver_id, state['version']))
+
+    def _fire_timers(self, now):
+        while self._timers and self._timers[0][0] <= now:
+            _, driver_id, version = heapq.heappop(self._timers)
+            if self._drivers[driver_id]['version'] == version:
+                self._reindex(driver_id, now)
+
+    def _describe(self, driver_id, postal_code, tier):
+        state = self._drivers[driver_id]
+        area_name, minutes = state['areas'][postal_code]
+        return {
+            'driver_id': driver_id,
+            'name': state['name'],
+            'phone': state['phone'],
+            'vehicle_type': state['vehicle_type'],
+            'area_name': area_name,
+            'delivery_time_minutes': minutes,
+            'last_delivery_time': state['last_delivery_time'],
+            'is_actually_available': tier == 0
+        }
+
+
+class DeliveryDashboardFeed:
+    """Live copy of the delivery dashboard, pushed to subscribers as diffs.
+
+    Drivers and active deliveries are read from the database once, when
+    the first subscriber arrives. After that the model hands over the
+    orders and drivers it changes (refresh()), and only rows that really
+    differ are published on the bus, each as an event with the next seq
+    number. Later subscribers start from the in-memory snapshot, so the
+    database sees the same load however many dashboards are open. When
+    the last subscriber leaves the copy is dropped, and changes cost
+    nothing until the next one arrives.
+    """
+
+    def __init__(self, bus=None, cooldown_minutes=30, clock=time.time):
+        self.bus = bus or EventBus()
+        self.cooldown = cooldown_minutes * 60
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._drivers = None     # driver_id -> dashboard row
+        self._deliveries = None  # order_id -> dashboard row
+        self._cooldowns = {}     # driver_id -> when 'Recently Delivered' ends
+        self.seq = 0
+
+    def is_live(self):
+        return self._drivers is not None
+
+    def subscribe(self, load):
+        """Return (subscription, snapshot); load() -> (drivers, deliveries) runs if no copy is held"""
+        with self._lock:
+            if self._drivers is None:
+                drivers, deliveries = load()
+                self._drivers = {driver['driver_id']: driver for driver in drivers}
+                self._deliveries = {delivery['order_id']: delivery for delivery in deliveries}
+                self._cooldowns = {}
+                for driver in drivers:
+                    self._track_cooldown(driver)
+            return self.bus.subscribe(), self._snapshot()
+
+    def resync(self, subscription):
+        """Fresh snapshot for a subscriber whose queue overflowed"""
+        with self._lock:
+            subscription.reset()
+            return self._snapshot()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.bus.unsubscribe(subscription)
+            if not self.bus.subscriber_count():
+                self._drivers = self._deliveries = None
+                self._cooldowns = {}
+
+    def refresh(self, read, order_ids=(), driver_ids=()):
+        """Publish what changed for the given orders and drivers.
+
+        read(order_ids, driver_ids) returns their current (driver rows,
+        active delivery rows); it runs under the feed lock, so concurrent
+        refreshes publish in the order they read. An order without an
+        active row leaves the dashboard.
+        """
+        order_ids = sorted(set(order_ids))
+        driver_ids = sorted({driver_id for driver_id in driver_ids if driver_id is not None})
+        if not order_ids and not driver_ids:
+            return
+        with self._lock:
+            if self._drivers is None:
+                return
+            drivers, deliveries = read(order_ids, driver_ids)
+            self._apply(drivers, deliveries, order_ids)
+
+    def reconcile(self, read):
+        """Re-read everything and publish what differs, for changes whose rows are not known.
+
+        read(None, None) returns every driver and active delivery.
+        """
+        with self._lock:
+            if self._drivers is None:
+                return
+            drivers, deliveries = read(None, None)
+            order_ids = set(self._deliveries) | {delivery['order_id'] for delivery in deliveries}
+            self._apply(drivers, deliveries, sorted(order_ids))
+
+    def _apply(self, drivers, deliveries, order_ids):
+        self._expire_cooldowns()
+        for driver in drivers:
+            self._track_cooldown(driver)
+            if self._drivers.get(driver['driver_id']) != driver:
+                self._drivers[driver['driver_id']] = driver
+                self._publish('driver', driver=driver)
+        active = {delivery['order_id']: delivery for delivery in deliveries}
+        for order_id in order_ids:
+            delivery = active.get(order_id)
+            if delivery is None:
+                if self._deliveries.pop(order_id, None) is not None:
+                    self._publish('delivery_removed', order_id=order_id)
+            elif self._deliveries.get(order_id) != delivery:
+                self._deliveries[order_id] = delivery
+                self._publish('delivery', delivery=delivery)
+
+    def expire_cooldowns(self):
+        """Publish drivers whose 'Recently Delivered' window has ended (no SQL).
+
+        refresh() does this as well; call it while no changes arrive.
+        """
+        with self._lock:
+            if self._drivers is not None:
+                self._expire_cooldowns()
+
+    def stats(self):
+        return {
+            'live': self.is_live(),
+            'subscribers': self.bus.subscriber_count(),
+            'seq': self.seq,
+            'published': self.bus.published
+        }
+
+    def _expire_cooldowns(self):
+        now = self.clock()
+        for driver_id, ends in sorted(self._cooldowns.items()):
+            if ends <= now:
+                del self._cooldowns[driver_id]
+                driver = dict(self._drivers[driver_id], availability_status='Available')
+                self._drivers[driver_id] = driver
+                self._publish('driver', driver=driver)
+
+    def _track_cooldown(self, driver):
+        self._cooldowns.pop(driver['driver_id'], None)
+        if driver['availability_status'] != 'Recently Delivered':
+            return
+        try:
+            delivered = calendar.timegm(time.strptime(driver['last_delivery_time'], '%Y-%m-%d %H:%M:%S'))
+        except (TypeError, ValueError):
+            return
+        self._cooldowns[driver['driver_id']] = delivered + self.cooldown
+
+    def _publish(self, kind, **payload):
+        self.seq += 1
+        self.bus.publish(dict(payload, type=kind, seq=self.seq))
+
+    def _snapshot(self):
+        # Same order as get_delivery_dashboard(): drivers that can take an
+        # order first, then by name; deliveries by estimated delivery time
+        def driver_rank(driver):
+            ready = driver['is_available'] or (
+                driver['last_delivery_time'] is not None and driver['availability_status'] == 'Available'
+            )
+            return (not ready, driver['name'])
+
+        return {
+            'seq': self.seq,
+            'drivers': sorted(self._drivers.values(), key=driver_rank),
+            'active_deliveries': sorted(
+                self._deliveries.values(),
+                key=lambda delivery: (delivery['estimated_delivery_time'] is not None,
+                                      delivery['estimated_delivery_time'] or '')
+            )
+        }
+
+
+def solve_assignment(cost):
+    """Minimum-total-cost assignment for a rectangular cost matrix.
+
+    cost is a list of rows; every row and every column is used at most
+    once. Returns sorted (row, column) pairs, leaving out pairs that cost
+    FORBIDDEN or more. Uses the Hungarian algorithm (shortest augmenting
+    paths, O(n^2 m) for n <= m), vectorized with NumPy when it is installed.
+    """
+    if not cost or not cost[0]:
+        return []
+    transposed = len(cost) > len(cost[0])
+    matrix = [list(column) for column in zip(*cost)] if transposed else cost
+    solve = _hungarian_numpy if np is not None else _hungarian_python
+    pairs = [(c, r) if transposed else (r, c) for r, c in solve(matrix)]
+    return sorted((r, c) for r, c in pairs if cost[r][c] < FORBIDDEN)
+
+
+def _hungarian_python(cost):
+    """Rows <= columns. Potentials u/v, p[j] = row matched to column j (1-based)."""
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j]]
+
+
+def _hungarian_numpy(cost):
+    """_hungarian_python with the per-column loops done as array operations"""
+    c = np.asarray(cost, dtype=float)
+    n, m = c.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            cur = np.full(m + 1, np.inf)
+            cur[1:] = c[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv)
+            minv[better] = cur[better]
+            way[better] = j0
+            candidates = np.where(free, minv, np.inf)
+            j1 = int(np.argmin(candidates))
+            delta = candidates[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = int(way[j0])
+            p[j0] = p[j1]
+            j0 = j1
+    return [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
@@ -0,0 +1,74 @@
+import queue
+import threading
+
+
+class Subscription:
+    """One subscriber's queue of pending events.
+
+    The queue is bounded so a stalled client cannot grow memory without
+    limit: once it is full further events are dropped and overflowed is
+    set, and the subscriber is expected to start over from a fresh
+    snapshot (then call reset()).
+    """
+
+    def __init__(self, max_pending):
+        self._queue = queue.Queue(max_pending)
+        self.overflowed = False
+
+    def put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def reset(self):
+        """Drop everything pending and accept events again"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self.overflowed = False
+
+
+class EventBus:
+    """In-process fan-out: every published event is queued for every subscriber.
+
+    Publishing never blocks and costs one queue put per subscriber; the
+    events themselves are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self.published = 0
+
+    def subscribe(self):
+        subscription = Subscription(self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription.put(event)
@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class OrderWriter:
+    """Single writer thread that group-commits queued orders.
+
+    write_batch(orders) must write a list of orders in one transaction and
+    return one result per order (PizzaModel.place_orders). After the first
+    order of a batch arrives the writer keeps collecting for up to window
+    seconds or until max_batch orders are queued, whichever comes first,
+    then writes them all with one commit. window=0 takes only what is
+    already waiting, so a lone order is never delayed.
+    """
+
+    def __init__(self, write_batch, window=0.002, max_batch=64):
+        self.write_batch = write_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.orders = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Write what is queued, then end the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def submit(self, order, resolve):
+        """Queue order; resolve(result) is called from the writer thread once it is committed"""
+        self.start()
+        self._queue.put((order, resolve))
+
+    def place(self, order):
+        """Queue order and block until its batch is written; returns its result"""
+        future = Future()
+        self.submit(order, future.set_result)
+        return future.result()
+
+    def is_writer_thread(self):
+        thread = self._thread
+        return thread is not None and thread is threading.current_thread()
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'orders': self.orders,
+            'avg_batch': round(self.orders / self.batches, 2) if self.batches else None,
+            'queued': self._queue.qsize()
+        }
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        try:
+            results = self.write_batch([order for order, _ in batch])
+        except Exception as e:
+            results = [{'success': False, 'error': str(e)}] * len(batch)
+        self.batches += 1
+        self.orders += len(batch)
+        for (_, resolve), result in zip(batch, results):
+            resolve(result)
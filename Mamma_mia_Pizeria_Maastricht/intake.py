@@ -0,0 +1,164 @@
+"""Asyncio order intake: concurrent validation, one writer, group commit.
+
+Requests are parsed and validated on the event loop, concurrently and
+without touching the database. Valid orders are queued to a single
+writer thread (groupcommit.OrderWriter), which takes everything waiting
+(up to max_batch orders) and writes it with PizzaModel.place_orders():
+one transaction, one savepoint per order, one commit. Each caller's future is then resolved
+with its own result. Only the writer ever writes through this path, so
+concurrent clients queue in memory instead of contending for SQLite's
+write lock.
+
+create_app() is a plain ASGI application (no framework needed); serve it
+with any ASGI server, e.g.
+
+    uvicorn --factory intake:create_app --port 8001
+
+It accepts the same POST /api/place_order JSON as the Flask app.
+
+The intake and the Flask app each have their own PizzaModel, so their
+own driver index, live sales counters and tracking cache. They share
+state through the database only: a driver is claimed with a guarded
+UPDATE (models.CLAIM_DRIVER), so a stale index never books a busy driver,
+and every write transaction bumps order_generation, so each process
+drops its in-memory state within a second of the other one writing
+(see caches.OrderGenerationWatch).
+"""
+import asyncio
+import json
+
+from groupcommit import OrderWriter
+from models import PRICE_SOURCES, PizzaModel
+
+CUSTOMER_FIELDS = {
+    'name': 'customer_name',
+    'email': 'customer_email',
+    'phone': 'customer_phone',
+    'address': 'customer_address',
+    'postal_code': 'customer_postal',
+    'birth_date': 'customer_birthdate',
+    'gender': 'customer_gender',
+}
+
+
+def order_from_payload(data):
+    """(customer_info, items, discount_code) from a /api/place_order JSON body"""
+    customer_info = {field: data[key] for field, key in CUSTOMER_FIELDS.items()}
+    return customer_info, data['items'], data.get('discount_code')
+
+
+def validate_order(customer_info, items):
+    """First error that rejects the order without a database lookup, or None"""
+    for field in CUSTOMER_FIELDS:
+        if not customer_info.get(field):
+            return f"Missing customer {field.replace('_', ' ')}"
+    if not isinstance(items, list) or not items:
+        return "Order must contain at least one item"
+    for item in items:
+        if not isinstance(item, dict) or item.get('type') not in PRICE_SOURCES:
+            return f"Invalid item: {item!r}"
+        quantity = item.get('quantity')
+        # bool is an int subclass; true must not become a quantity of 1
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0 or quantity > 20:
+            return f"Invalid quantity for item: {quantity}"
+    if not any(item['type'] == 'pizza' for item in items):
+        return "Order must contain at least one pizza"
+    return None
+
+
+class OrderIntake:
+    """Asyncio front end of an OrderWriter.
+
+    submit() is a coroutine; any number of them may be pending on any
+    number of event loops. By default the writer does not wait for more
+    orders (window=0): it writes whatever queued up while the previous
+    batch was being committed, up to max_batch.
+    """
+
+    def __init__(self, model, max_batch=256, window=0.0):
+        self.model = model
+        self.writer = OrderWriter(model.place_orders, window=window, max_batch=max_batch)
+
+    def start(self):
+        self.writer.start()
+
+    def stop(self):
+        """Write what is queued, then end the writer thread"""
+        self.writer.stop()
+
+    async def submit(self, customer_info, items, discount_code=None):
+        """Place one order; resolves to the place_order() result"""
+        error = validate_order(customer_info, items)
+        if error:
+            return {'success': False, 'error': error}
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.writer.submit(
+            (customer_info, items, discount_code),
+            lambda result: loop.call_soon_threadsafe(_resolve, future, result)
+        )
+        return await future
+
+    def stats(self):
+        return self.writer.stats()
+
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def create_app(model=None, max_batch=256, window=0.0):
+    """ASGI application: POST /api/place_order and GET /api/intake/stats"""
+    model = model or PizzaModel()
+    intake = OrderIntake(model, max_batch=max_batch, window=window)
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    intake.start()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await asyncio.get_running_loop().run_in_executor(None, intake.stop)
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        method, path = scope['method'], scope['path']
+        if method == 'POST' and path == '/api/place_order':
+            body = b''
+            while True:
+                message = await receive()
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    break
+            try:
+                order = order_from_payload(json.loads(body))
+            except (ValueError, KeyError, TypeError) as e:
+                await _send_json(send, 400, {'success': False, 'error': f"Invalid order request: {e}"})
+                return
+            error = validate_order(order[0], order[1])
+            if error:
+                await _send_json(send, 400, {'success': False, 'error': error})
+                return
+            await _send_json(send, 200, await intake.submit(*order))
+        elif method == 'GET' and path == '/api/intake/stats':
+            await _send_json(send, 200, intake.stats())
+        else:
+            await _send_json(send, 404, {'error': 'Not found'})
+
+    app.intake = intake
+    return app
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
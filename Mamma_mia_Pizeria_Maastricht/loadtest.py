@@ -0,0 +1,127 @@
+"""HTTP load generator for POST /api/place_order.
+
+Runs CLIENTS concurrent keep-alive connections from one asyncio loop and
+reports throughput, latency percentiles and how many orders failed (and
+how many of those on a locked database). Works against the Flask app and
+the ASGI intake alike; every order uses a fresh customer email.
+
+Usage:
+    python loadtest.py [URL] [--clients N] [--orders N]
+
+    python app.py                                       # Flask, port 5000
+    python loadtest.py http://127.0.0.1:5000 --clients 32
+
+    uvicorn --factory intake:create_app --port 8001     # asyncio intake
+    python loadtest.py http://127.0.0.1:8001 --clients 32
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+import urllib.parse
+
+CART = [
+    {'type': 'pizza', 'id': 1, 'quantity': 2},
+    {'type': 'drink', 'id': 1, 'quantity': 1},
+]
+
+
+def order_payload(n, run_id, postal_code='6211'):
+    return {
+        'customer_name': f'Load Test {n}',
+        'customer_email': f'load-{run_id}-{n}@example.com',
+        'customer_phone': '+31 6 00000000',
+        'customer_address': f'Teststraat {n}',
+        'customer_postal': postal_code,
+        'customer_birthdate': '1990-01-01',
+        'customer_gender': 'Other',
+        'items': CART,
+    }
+
+
+async def _post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(
+        f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n'.encode('latin-1') + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Server closed the connection')
+    status = int(status_line.split()[1])
+    length = 0
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+        elif name.strip().lower() == 'connection' and value.strip().lower() == 'close':
+            close = True
+    data = await reader.readexactly(length) if length else b''
+    return status, json.loads(data) if data else None, close
+
+
+async def run_load(url, clients=16, orders=2000):
+    """Send orders orders over clients connections; returns a summary dict"""
+    parsed = urllib.parse.urlsplit(url)
+    host, port = parsed.hostname, parsed.port or 80
+    path = parsed.path.rstrip('/') + '/api/place_order'
+    run_id = int(time.time() * 1000)
+    numbers = itertools.count()
+    latencies = []
+    failures = {'total': 0, 'locked': 0, 'http': 0}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                n = next(numbers)
+                if n >= orders:
+                    return
+                start = time.perf_counter()
+                status, result, close = await _post(reader, writer, f'{host}:{port}', path, order_payload(n, run_id))
+                latencies.append(time.perf_counter() - start)
+                if status != 200 or not (result or {}).get('success'):
+                    failures['total'] += 1
+                    failures['http'] += status != 200
+                    failures['locked'] += 'locked' in str((result or {}).get('error', ''))
+                if close:
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(host, port)
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        'clients': clients,
+        'orders': len(latencies),
+        'seconds': round(elapsed, 3),
+        'orders_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(ordered) * 1000, 2) if ordered else None,
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2) if ordered else None,
+        'failed': failures['total'],
+        'failed_locked': failures['locked'],
+        'failed_http': failures['http']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--orders', type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_load(args.url, args.clients, args.orders)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import bisect
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the statements-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe on its own)"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le label, observations <= bound)], ending with +Inf"""
+        running = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            running += count
+            buckets.append(('+Inf' if bound == float('inf') else _number(bound), running))
+        return buckets
+
+
+class RouteStats:
+    """Everything recorded for one (method, route, status) series"""
+
+    __slots__ = ('duration', 'db', 'queries', 'python_seconds')
+
+    def __init__(self):
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.db = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.python_seconds = 0.0
+
+
+class RequestMetrics:
+    """Per-route request latency, database time and statement counts.
+
+    The app records one observation per finished request: its wall time,
+    the part of it spent inside SQLite (from the QueryProfiler tally of the
+    request's thread) and how many statements it ran; the rest is counted
+    as Python time. Routes are labelled by their URL rule, not the concrete
+    path, so /api/order/<int:order_id> is one series.
+    """
+
+    def __init__(self, prefix='pizza_http'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, method, route, status, seconds, db_seconds, queries):
+        key = (method, route, str(status))
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.duration.observe(seconds)
+            stats.db.observe(db_seconds)
+            stats.queries.observe(queries)
+            stats.python_seconds += max(seconds - db_seconds, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def render(self):
+        """All series in the Prometheus text exposition format"""
+        p = self.prefix
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for name, kind, help_text, attribute in (
+                (f'{p}_request_duration_seconds', 'histogram', 'Request wall time', 'duration'),
+                (f'{p}_request_db_seconds', 'histogram', 'Time spent in SQLite per request (a group-committed order counts its whole batch)', 'db'),
+                (f'{p}_request_queries', 'histogram', 'SQL statements run per request (a group-committed order counts its whole batch)', 'queries'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, stats in routes:
+                    labels = _labels(key)
+                    histogram = getattr(stats, attribute)
+                    for le, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            name = f'{p}_request_python_seconds_total'
+            lines.append(f'# HELP {name} Request time spent outside SQLite')
+            lines.append(f'# TYPE {name} counter')
+            for key, stats in routes:
+                lines.append(f'{name}{{{_labels(key)}}} {_number(stats.python_seconds)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(key):
+    method, route, status = key
+    return f'method="{_escape(method)}",route="{_escape(route)}",status="{status}"'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,346 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Progress handler granularity: one callback per this many VM instructions
+PROGRESS_STEPS = 1000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+def normalize_sql(sql):
+    """Statement text with literals and parameter lists folded to '?' and whitespace collapsed"""
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _PLACEHOLDER_LIST.sub('?, ...', text)
+    return ' '.join(text.split())
+
+
+class StatementStats:
+    """Counters for one normalized statement"""
+
+    __slots__ = ('calls', 'seconds', 'rows', 'vm_steps', 'samples')
+
+    def __init__(self, sample_size):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.vm_steps = 0
+        # One-element lists, so fetches can add to the sample of their execute
+        self.samples = deque(maxlen=sample_size)
+
+
+class QueryProfiler:
+    """Per-statement call counts, latencies, rows and VM work for a Database.
+
+    ProfilingConnection/ProfilingCursor time every execute, executemany,
+    fetch and commit, so a statement's latency runs from execute until its
+    last row is fetched. The progress handler attributes virtual machine
+    instructions (trigger bodies included) to the statement that runs them.
+    The trace callback counts statements that bypass the cursor, such as
+    executescript() contents. Latency percentiles cover the most recent
+    sample_size calls of each statement.
+
+    begin_tally()/end_tally() additionally sum the database time and
+    statement count of everything one thread runs in between, e.g. for a
+    single web request.
+    """
+
+    def __init__(self, enabled=True, sample_size=512, max_statements=500):
+        self.enabled = enabled
+        self.sample_size = sample_size
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._normalized = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+            self.dropped = 0
+
+    def attach(self, conn):
+        """Install the trace callback and progress handler on a ProfilingConnection"""
+        conn.profiler = self
+        conn.set_trace_callback(lambda sql: self._traced(conn, sql))
+        conn.set_progress_handler(lambda: self._progress(conn), PROGRESS_STEPS)
+
+    def begin_tally(self):
+        """Start summing this thread's database seconds and statements"""
+        self._local.tally = [0.0, 0]
+
+    def end_tally(self):
+        """(seconds, statements) since begin_tally(); (0.0, 0) if none was started"""
+        tally = getattr(self._local, 'tally', None)
+        self._local.tally = None
+        return tuple(tally) if tally else (0.0, 0)
+
+    def add_to_tally(self, seconds, statements):
+        """Count database work another thread ran on behalf of this one"""
+        tally = getattr(self._local, 'tally', None)
+        if tally is not None:
+            tally[0] += seconds
+            tally[1] += statements
+
+    def normalize(self, sql):
+        key = self._normalized.get(sql)
+        if key is None:
+            key = normalize_sql(sql)
+            if len(self._normalized) < 4096:
+                self._normalized[sql] = key
+        return key
+
+    def record(self, key, seconds, rows=0):
+        """Add one call of statement key; returns its latency sample (or None)"""
+        tally = getattr(self._local, 'tally', None)
+        if tally is not None:
+            tally[0] += seconds
+            tally[1] += 1
+        sample = [seconds]
+        with self._lock:
+            stats = self._entry(key)
+            if stats is None:
+                return None
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.rows += rows
+            stats.samples.append(sample)
+        return sample
+
+    def add_fetch(self, key, sample, seconds, rows):
+        """Fetch time and rows that belong to an earlier record()"""
+        tally = getattr(self._local, 'tally', None)
+        if tally is not None:
+            tally[0] += seconds
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                return
+            stats.seconds += seconds
+            stats.rows += rows
+            if sample is not None:
+                sample[0] += seconds
+
+    def statement_count(self):
+        return len(self._stats)
+
+    def snapshot(self, limit=None):
+        """Statement stats, most total time first"""
+        with self._lock:
+            rows = []
+            for key, stats in self._stats.items():
+                latencies = sorted(sample[0] for sample in stats.samples)
+                rows.append({
+                    'sql': key,
+                    'calls': stats.calls,
+                    'total_ms': round(stats.seconds * 1000, 3),
+                    'p50_ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+                    'p99_ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+                    'rows': stats.rows,
+                    'vm_steps': stats.vm_steps * PROGRESS_STEPS
+                })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def _entry(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_statements:
+                self.dropped += 1
+                return None
+            stats = self._stats[key] = StatementStats(self.sample_size)
+        return stats
+
+    def _traced(self, conn, sql):
+        if self.enabled and not conn.profiling_depth:
+            self.record(self.normalize(sql), 0.0)
+
+    def _progress(self, conn):
+        key = conn.profile_key
+        if key is not None:
+            stats = self._stats.get(key)
+            if stats is not None:
+                stats.vm_steps += 1
+        return 0
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """sqlite3.Cursor that reports to its connection's QueryProfiler"""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._key = None
+        self._sample = None
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+    def _run(self, method, sql, parameters):
+        conn = self.connection
+        profiler = conn.profiler
+        # Nested statements (user functions, unprofiled() blocks) are not counted
+        if not profiler.enabled or conn.profiling_depth:
+            self._key = None
+            method(sql, parameters)
+            return self
+        key = self._key = profiler.normalize(sql)
+        conn.profile_key = key
+        conn.profiling_depth += 1
+        start = time.perf_counter()
+        try:
+            method(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            conn.profiling_depth -= 1
+            conn.profile_key = None
+        # Statements without a result set report the rows they changed
+        changed = self.rowcount if self.description is None and self.rowcount > 0 else 0
+        self._sample = profiler.record(key, elapsed, changed)
+        return self
+
+    def _fetch(self, method, *args):
+        key = self._key
+        if key is None:
+            return method(*args)
+        conn = self.connection
+        conn.profile_key = key
+        conn.profiling_depth += 1
+        start = time.perf_counter()
+        try:
+            result = method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            conn.profiling_depth -= 1
+            conn.profile_key = None
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        conn.profiler.add_fetch(key, self._sample, elapsed, rows)
+        return result
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors, shortcuts and commits are profiled.
+
+    Used as the sqlite3.connect() factory; QueryProfiler.attach() binds it
+    to a profiler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profiler = QueryProfiler(enabled=False)
+        self.profile_key = None
+        self.profiling_depth = 0
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        self._timed('COMMIT', super().commit)
+
+    def rollback(self):
+        self._timed('ROLLBACK', super().rollback)
+
+    @contextmanager
+    def unprofiled(self):
+        """Statements run inside the block are left out of the profile"""
+        self.profiling_depth += 1
+        try:
+            yield self
+        finally:
+            self.profiling_depth -= 1
+
+    def _timed(self, key, method):
+        # Outside a transaction commit() and rollback() do nothing worth counting
+        if not self.profiler.enabled or self.profiling_depth or not self.in_transaction:
+            return method()
+        self.profiling_depth += 1
+        start = time.perf_counter()
+        try:
+            return method()
+        finally:
+            self.profiling_depth -= 1
+            self.profiler.record(key, time.perf_counter() - start)
+
+
+def explain_query_plan(cursor, sql):
+    """EXPLAIN QUERY PLAN lines for a normalized statement, parameters bound to NULL"""
+    sql = sql.replace('?, ...', '?')
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', [None] * sql.count('?'))
+    return [row[3] for row in cursor.fetchall()]
+
+
+def analyze_database(cursor, analysis_limit=400):
+    """Run a sampled ANALYZE so sqlite_stat1 has row estimates, and commit it.
+
+    This rewrites the statistics the query planner uses, so it is an
+    explicit admin action, never part of a read. analysis_limit keeps it
+    to a few hundred rows per index; the connection's previous limit is
+    restored afterwards since pooled connections are reused.
+    """
+    cursor.execute('PRAGMA analysis_limit')
+    previous = cursor.fetchone()[0]
+    cursor.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+    try:
+        cursor.execute('ANALYZE')
+        cursor.connection.commit()
+    finally:
+        cursor.execute(f'PRAGMA analysis_limit = {int(previous)}')
+
+
+def estimate_table_sizes(cursor):
+    """{table: estimated rows} from sqlite_stat1, without counting any table.
+
+    Read-only: tables ANALYZE recorded nothing for, or every table when the
+    database has never been analyzed (see analyze_database), are reported
+    as None.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    tables = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        return {table: None for table in tables}
+
+    cursor.execute('SELECT tbl, stat FROM sqlite_stat1')
+    estimates = {}
+    for table, stat in cursor.fetchall():
+        rows = int(stat.split()[0]) if stat else 0
+        estimates[table] = max(estimates.get(table, 0), rows)
+    return {table: estimates.get(table) for table in tables}
@@ -0,0 +1,253 @@
+import json
+import threading
+import time
+
+# Deliveries at or under this many minutes count as on time
+ON_TIME_MINUTES = 45
+
+# Every status except 'Cancelled', spelled out so that the (status, order_ts)
+# index can seek each one instead of scanning for status != 'Cancelled'
+OPEN_STATUSES = "('Pending', 'Preparing', 'Out for Delivery', 'Delivered')"
+
+# Window starts as epoch seconds, matching date('now', '-1 month') etc.;
+# constant per statement, so order_ts >= ... stays an index range
+MONTH_START = "CAST(strftime('%s', 'now', '-1 month', 'start of day') AS INTEGER)"
+QUARTER_START = "CAST(strftime('%s', 'now', '-3 month', 'start of day') AS INTEGER)"
+
+# Every order-level aggregate of the staff report in a single scan of orders.
+# Plain totals are SQL aggregates; the grouped figures (per customer, hour and
+# driver) go through the order_breakdown aggregate below, which hashes rows
+# into dicts instead of making SQLite sort the whole table for a GROUP BY.
+# Customer attributes (gender, age group, postal code) are applied
+# afterwards to the per-customer totals, so the scan needs no join.
+ORDER_SCAN_QUERY = f'''
+    SELECT
+        COUNT(*),
+        COUNT(CASE WHEN total_amount > 0 THEN 1 END),
+        SUM(CASE WHEN total_amount > 0 THEN total_amount END),
+        SUM(CASE WHEN discount_applied > 0 THEN discount_applied END),
+        COUNT(actual_delivery_ts),
+        AVG((actual_delivery_ts - order_ts) / 60.0),
+        COUNT(CASE WHEN actual_delivery_ts - order_ts <= {ON_TIME_MINUTES * 60} THEN 1 END),
+        order_breakdown(
+            customer_id,
+            order_ts / 3600 % 24,
+            CASE WHEN actual_delivery_ts IS NOT NULL THEN delivery_person_id END,
+            total_amount
+        )
+    FROM orders
+'''
+
+
+class OrderBreakdown:
+    """SQLite aggregate: order_breakdown(customer_id, hour, delivered_by, amount).
+
+    Sums amount per customer and counts orders per hour and delivered
+    orders per driver. The result is returned as a JSON document.
+    """
+
+    def __init__(self):
+        self.customers = {}
+        self.hours = {}
+        self.drivers = {}
+
+    def step(self, customer_id, hour, delivered_by, amount):
+        customers = self.customers
+        customers[customer_id] = customers.get(customer_id, 0) + amount
+        self.hours[hour] = self.hours.get(hour, 0) + 1
+        if delivered_by is not None:
+            self.drivers[delivered_by] = self.drivers.get(delivered_by, 0) + 1
+
+    def finalize(self):
+        return json.dumps({
+            'customers': list(self.customers.items()),
+            'hours': list(self.hours.items()),
+            'drivers': list(self.drivers.items())
+        })
+
+
+def _grouped(totals):
+    """{key: sum} as the (key, sum) rows a GROUP BY key query returns"""
+    return sorted(totals.items(), key=lambda item: (item[0] is not None, item[0]))
+
+
+def aggregate_orders(cursor):
+    """Every order-level aggregate of the staff report from one scan of orders.
+
+    Replaces the separate GROUP BY queries (and helper methods) that each
+    scanned orders on their own; the cost is one pass over orders plus one
+    over customers. Needs the order_breakdown aggregate, which
+    Database.setup_connection registers on every pooled connection.
+    """
+    cursor.execute(ORDER_SCAN_QUERY)
+    (order_count, paid_count, paid_total, discount_total,
+     deliveries, avg_delivery_minutes, on_time, breakdown) = cursor.fetchone()
+    breakdown = json.loads(breakdown) if breakdown else {'customers': [], 'hours': [], 'drivers': []}
+
+    # Served by the partial index idx_orders_birthday_discount
+    cursor.execute('SELECT COUNT(*) FROM orders WHERE birthday_discount_applied = 1')
+    birthday_offers = cursor.fetchone()[0]
+
+    cursor.execute('''
+        SELECT
+            customer_id,
+            gender,
+            CASE
+                WHEN (strftime('%Y', 'now') - strftime('%Y', birth_date)) < 25 THEN 'Under 25'
+                WHEN (strftime('%Y', 'now') - strftime('%Y', birth_date)) BETWEEN 25 AND 40 THEN '25-40'
+                ELSE 'Over 40'
+            END as age_group,
+            postal_code
+        FROM customers
+    ''')
+    segments = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    by_gender, by_age, by_postal = {}, {}, {}
+    for customer_id, amount in breakdown['customers']:
+        segment = segments.get(customer_id)
+        if segment is None:
+            continue
+        gender, age_group, postal_code = segment
+        by_gender[gender] = by_gender.get(gender, 0) + amount
+        by_age[age_group] = by_age.get(age_group, 0) + amount
+        by_postal[postal_code] = by_postal.get(postal_code, 0) + amount
+
+    top_driver = None
+    if breakdown['drivers']:
+        cursor.execute('SELECT driver_id, name FROM delivery_persons')
+        names = dict(cursor.fetchall())
+        per_name = {}
+        for driver_id, count in breakdown['drivers']:
+            if driver_id in names:
+                per_name[names[driver_id]] = per_name.get(names[driver_id], 0) + count
+        if per_name:
+            top_driver = max(per_name.items(), key=lambda item: item[1])[0]
+
+    return {
+        'earnings_by_gender': _grouped(by_gender),
+        'earnings_by_age': _grouped(by_age),
+        'earnings_by_postal': _grouped(by_postal),
+        'order_count': order_count,
+        'avg_paid_order_value': paid_total / paid_count if paid_count else None,
+        'discount_total': discount_total or 0,
+        'birthday_offers': birthday_offers,
+        'deliveries': deliveries,
+        'avg_delivery_minutes': avg_delivery_minutes,
+        'on_time_deliveries': on_time,
+        'top_driver': top_driver,
+        'peak_hours': [
+            (None if hour is None else f'{hour:02d}', count)
+            for hour, count in sorted(breakdown['hours'], key=lambda item: (-item[1], item[0] is None, item[0] or 0))[:3]
+        ]
+    }
+
+
+class LiveSalesCounters:
+    """Sliding-window sales figures for the dashboard's real_time_stats.
+
+    Keeps one bucket per (UTC) day of the last three months: revenue and
+    pizzas sold, plus how many orders each customer placed that day. The
+    model records every order it places or cancels after committing, so
+    reading the figures touches at most ~92 day buckets and never runs SQL.
+    Windows start at midnight, exactly like the date('now', '-1 month')
+    filters they replace. Cancelled orders do not count.
+
+    The counters are rebuilt from the database on first use, whenever the
+    day changes (the windows move) and every reconcile_interval seconds, to
+    pick up orders written elsewhere.
+    """
+
+    def __init__(self, reconcile_interval=300.0, clock=time.time):
+        self.reconcile_interval = reconcile_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._days = {}            # day -> [revenue, pizzas]
+        self._customer_days = {}   # customer_id -> {day: order count}
+        self._revenue_since = None
+        self._active_since = None
+        self._loaded_at = None
+        self._loaded_day = None
+
+    def _today(self):
+        return time.strftime('%Y-%m-%d', time.gmtime(self.clock()))
+
+    def needs_reload(self):
+        return (self._loaded_at is None
+                or self._loaded_day != self._today()
+                or self.clock() - self._loaded_at >= self.reconcile_interval)
+
+    def invalidate(self):
+        """Force a rebuild from the database before the next read"""
+        self._loaded_at = None
+
+    def load(self, conn):
+        """(Re)build every bucket from orders and order_items"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT date('now'), date('now', '-1 month'), date('now', '-3 month')")
+        today, revenue_since, active_since = cursor.fetchone()
+        cursor.execute(f'''
+            SELECT 
+                date(o.order_ts, 'unixepoch'),
+                o.customer_id,
+                COUNT(*),
+                SUM(CASE WHEN o.total_amount > 0 THEN o.total_amount ELSE 0 END),
+                SUM((SELECT COALESCE(SUM(quantity), 0) FROM order_items 
+                     WHERE order_id = o.order_id AND +item_type = 'pizza'))
+            FROM orders o
+            WHERE o.status IN {OPEN_STATUSES}
+            AND o.order_ts >= CAST(strftime('%s', ?) AS INTEGER)
+            GROUP BY 1, 2
+        ''', (active_since,))
+        rows = cursor.fetchall()
+
+        with self._lock:
+            self._days = {}
+            self._customer_days = {}
+            self._revenue_since = revenue_since
+            self._active_since = active_since
+            for day, customer_id, orders, revenue, pizzas in rows:
+                self._apply(day, customer_id, orders, revenue, pizzas)
+            self._loaded_at = self.clock()
+            self._loaded_day = today
+
+    def record_order(self, customer_id, amount, pizzas, day=None):
+        """A committed new order (day defaults to today)"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._apply(day or self._today(), customer_id, 1, max(amount, 0), pizzas)
+
+    def remove_order(self, customer_id, amount, pizzas, day):
+        """A committed cancellation of an order placed on day"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._apply(day, customer_id, -1, -max(amount, 0), -pizzas)
+
+    def snapshot(self):
+        """{'monthly_revenue', 'total_pizzas', 'active_customers'} for the current windows"""
+        with self._lock:
+            revenue = 0.0
+            pizzas = 0
+            for day, (day_revenue, day_pizzas) in self._days.items():
+                if day >= self._revenue_since:
+                    revenue += day_revenue
+                    pizzas += day_pizzas
+            return {
+                'monthly_revenue': round(revenue, 2),
+                'total_pizzas': pizzas,
+                # Only days inside the three-month window are kept
+                'active_customers': len(self._customer_days)
+            }
+
+    def _apply(self, day, customer_id, orders, revenue, pizzas):
+        if day is None or day < self._active_since:
+            return
+        bucket = self._days.setdefault(day, [0.0, 0])
+        bucket[0] += revenue
+        bucket[1] += pizzas
+
+        days = self._customer_days.setdefault(customer_id, {})
+        days[day] = days.get(day, 0) + orders
+        if days[day] <= 0:
+            del days[day]
+        if not days:
+            del self._customer_days[customer_id]